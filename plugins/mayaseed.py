@@ -349,6 +349,83 @@ def ms_renderSettings_nodeInitializer():
     force_linear_color_interpretation_nAttr = OpenMaya.MFnNumericAttribute()
     ms_renderSettings.force_linear_color_interpretation = force_linear_color_interpretation_nAttr.create("force_linear_color_interpretation", "force_linear_color_interpretation", OpenMaya.MFnNumericData.kBoolean, False)
 
+    # scene walker enum
+    scene_walker_enumAttr = OpenMaya.MFnEnumAttribute()
+    ms_renderSettings.scene_walker = scene_walker_enumAttr.create("scene_walker", "scene_walker")
+    scene_walker_enumAttr.addField("Maya Commands", 0)
+    scene_walker_enumAttr.addField("OpenMaya DAG Walker", 1)
+
+    # dg context sampling
+    dg_context_sampling_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.dg_context_sampling = dg_context_sampling_nAttr.create("dg_context_sampling", "dg_context_sampling", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # optimize static transforms, transforms whose matrix inputs are neither connected nor moved by IK are sampled once
+    optimize_static_transforms_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.optimize_static_transforms = optimize_static_transforms_nAttr.create("optimize_static_transforms", "optimize_static_transforms", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # prune empty transforms
+    prune_empty_transforms_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.prune_empty_transforms = prune_empty_transforms_nAttr.create("prune_empty_transforms", "prune_empty_transforms", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # reuse the shading nodes, textures and geometry files of the nodes not edited since the previous export,
+    # the scene is still sampled and translated in full
+    reuse_unedited_nodes_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.reuse_unedited_nodes = reuse_unedited_nodes_nAttr.create("reuse_unedited_nodes", "reuse_unedited_nodes", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # write scene cache
+    write_scene_cache_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.write_scene_cache = write_scene_cache_nAttr.create("write_scene_cache", "write_scene_cache", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # reuse frame invariant entities
+    reuse_frame_invariant_entities_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.reuse_frame_invariant_entities = reuse_frame_invariant_entities_nAttr.create("reuse_frame_invariant_entities", "reuse_frame_invariant_entities", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # collapse matrix stacks
+    collapse_matrix_stacks_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.collapse_matrix_stacks = collapse_matrix_stacks_nAttr.create("collapse_matrix_stacks", "collapse_matrix_stacks", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # merge structurally identical materials
+    deduplicate_materials_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.deduplicate_materials = deduplicate_materials_nAttr.create("deduplicate_materials", "deduplicate_materials", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # translate frames in worker processes
+    parallel_translation_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.parallel_translation = parallel_translation_nAttr.create("parallel_translation", "parallel_translation", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # hoist nested moving assemblies into the root assembly
+    flatten_assemblies_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.flatten_assemblies = flatten_assemblies_nAttr.create("flatten_assemblies", "flatten_assemblies", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # group static object instances into spatially coherent assemblies
+    partition_static_instances_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.partition_static_instances = partition_static_instances_nAttr.create("partition_static_instances", "partition_static_instances", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # maximum number of object instances in the assemblies of spatially partitioned static instances
+    partition_size_AttrInt = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.partition_size = partition_size_AttrInt.create("partition_size", "partition_size", OpenMaya.MFnNumericData.kInt, 256)
+    partition_size_AttrInt.setMin(1)
+
+    # drop the transform motion samples that appleseed reproduces by interpolating the kept ones
+    adaptive_motion_samples_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.adaptive_motion_samples = adaptive_motion_samples_nAttr.create("adaptive_motion_samples", "adaptive_motion_samples", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # largest matrix difference allowed between a dropped motion sample and its interpolated value
+    motion_sample_tolerance_AttrFloat = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.motion_sample_tolerance = motion_sample_tolerance_AttrFloat.create("motion_sample_tolerance", "motion_sample_tolerance", OpenMaya.MFnNumericData.kFloat, 0.001)
+    motion_sample_tolerance_AttrFloat.setMin(0)
+
+    # keep the project and geometry files whose content did not change since the previous export
+    skip_unchanged_files_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.skip_unchanged_files = skip_unchanged_files_nAttr.create("skip_unchanged_files", "skip_unchanged_files", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # write the entities shared by every frame once to a static data file loaded by the frame projects
+    share_static_data_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.share_static_data = share_static_data_nAttr.create("share_static_data", "share_static_data", OpenMaya.MFnNumericData.kBoolean, False)
+
+    # save each frame as an .appleseedz package holding the project and the geometry and textures it refers to
+    package_projects_nAttr = OpenMaya.MFnNumericAttribute()
+    ms_renderSettings.package_projects = package_projects_nAttr.create("package_projects", "package_projects", OpenMaya.MFnNumericData.kBoolean, False)
+
     # add attributes
     ms_renderSettings.addAttribute(ms_renderSettings.export_button)
 
@@ -416,6 +493,24 @@ def ms_renderSettings_nodeInitializer():
 
     ms_renderSettings.addAttribute(ms_renderSettings.force_linear_texture_interpretation)
     ms_renderSettings.addAttribute(ms_renderSettings.force_linear_color_interpretation)
+    ms_renderSettings.addAttribute(ms_renderSettings.scene_walker)
+    ms_renderSettings.addAttribute(ms_renderSettings.dg_context_sampling)
+    ms_renderSettings.addAttribute(ms_renderSettings.optimize_static_transforms)
+    ms_renderSettings.addAttribute(ms_renderSettings.prune_empty_transforms)
+    ms_renderSettings.addAttribute(ms_renderSettings.reuse_unedited_nodes)
+    ms_renderSettings.addAttribute(ms_renderSettings.write_scene_cache)
+    ms_renderSettings.addAttribute(ms_renderSettings.reuse_frame_invariant_entities)
+    ms_renderSettings.addAttribute(ms_renderSettings.collapse_matrix_stacks)
+    ms_renderSettings.addAttribute(ms_renderSettings.deduplicate_materials)
+    ms_renderSettings.addAttribute(ms_renderSettings.parallel_translation)
+    ms_renderSettings.addAttribute(ms_renderSettings.flatten_assemblies)
+    ms_renderSettings.addAttribute(ms_renderSettings.partition_static_instances)
+    ms_renderSettings.addAttribute(ms_renderSettings.partition_size)
+    ms_renderSettings.addAttribute(ms_renderSettings.adaptive_motion_samples)
+    ms_renderSettings.addAttribute(ms_renderSettings.motion_sample_tolerance)
+    ms_renderSettings.addAttribute(ms_renderSettings.skip_unchanged_files)
+    ms_renderSettings.addAttribute(ms_renderSettings.share_static_data)
+    ms_renderSettings.addAttribute(ms_renderSettings.package_projects)
 
 
 #--------------------------------------------------------------------------------------------------
@@ -21,9 +21,14 @@
 # THE SOFTWARE.
 #
 
-import maya.cmds as cmds
-import maya.mel as mel
-import maya.utils as mu
+try:
+    import maya.cmds as cmds
+    import maya.mel as mel
+    import maya.OpenMaya as OpenMaya
+    import maya.utils as mu
+except ImportError:
+    # Maya is not available when a scene cache is translated by tools/translate_scene_cache.py
+    cmds = mel = OpenMaya = mu = None
 import os
 import sys
 import inspect
@@ -33,6 +38,12 @@ import ms_export_obj
 import random
 import math
 
+# NumPy is optional, the batched matrix functions fall back to plain Python without it
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 #--------------------------------------------------------------------------------------------------
 # Constants.
@@ -143,6 +154,30 @@ def convert_connection_to_image(shader, attribute, dest_file, resolution=1024, p
         return dest_file
 
 
+#--------------------------------------------------------------------------------------------------
+# Find the Python interpreter shipped with Maya.
+#--------------------------------------------------------------------------------------------------
+
+def find_path_to_mayapy():
+    # mayapy is in the bin directory of MAYA_LOCATION on every platform, sys.executable is Maya
+    # itself when running in the GUI, which cannot be used to run scripts in other processes
+    executable_name = os.path.basename(sys.executable).lower()
+    if executable_name.startswith('python') or executable_name.startswith('mayapy'):
+        return sys.executable
+
+    if 'MAYA_LOCATION' not in os.environ:
+        return None
+
+    mayapy_path = os.path.join(os.environ['MAYA_LOCATION'], 'bin', 'mayapy')
+    if sys.platform == 'win32':
+        mayapy_path += '.exe'
+
+    if os.path.exists(mayapy_path):
+        return mayapy_path
+
+    return None
+
+
 #--------------------------------------------------------------------------------------------------
 # Convert textures to OpenEXR format.
 #--------------------------------------------------------------------------------------------------
@@ -252,6 +287,90 @@ def transform_is_visible(node_name):
     return True
 
 
+#--------------------------------------------------------------------------------------------------
+# OpenMaya equivalent of transform_is_visible() for nodes found while walking the DAG.
+#--------------------------------------------------------------------------------------------------
+
+def dag_node_is_visible(dag_path, context=None):
+    if context is None:
+        context = OpenMaya.MDGContext.fsNormal
+
+    dep_node = OpenMaya.MFnDependencyNode(dag_path.node())
+
+    # check if the visibility set to off
+    if not dep_node.findPlug('visibility').asBool(context):
+        return False
+
+    # check to see if it's an intermediate mesh
+    if dep_node.hasAttribute('intermediateObject') and dep_node.findPlug('intermediateObject').asBool(context):
+        return False
+
+    # check if it is a hidden display layer
+    if dep_node.hasAttribute('overrideEnabled') and dep_node.findPlug('overrideEnabled').asBool(context):
+        if not dep_node.findPlug('overrideVisibility').asBool(context):
+            return False
+
+    return True
+
+
+#--------------------------------------------------------------------------------------------------
+# Check if any of the given attributes of a node are connected.
+#--------------------------------------------------------------------------------------------------
+
+def has_connections(node, attribute_names):
+    dep_node = OpenMaya.MFnDependencyNode(node)
+
+    for attribute_name in attribute_names:
+        if dep_node.findPlug(attribute_name).isConnected():
+            return True
+
+    return False
+
+
+#--------------------------------------------------------------------------------------------------
+# OpenMaya lookup functions.
+#--------------------------------------------------------------------------------------------------
+
+def get_dag_path(node_name):
+    selection_list = OpenMaya.MSelectionList()
+    selection_list.add(node_name)
+    dag_path = OpenMaya.MDagPath()
+    selection_list.getDagPath(0, dag_path)
+    return dag_path
+
+def get_dependency_node(node_name):
+    selection_list = OpenMaya.MSelectionList()
+    selection_list.add(node_name)
+    node = OpenMaya.MObject()
+    selection_list.getDependNode(0, node)
+    return node
+
+def get_plug(plug_name):
+    selection_list = OpenMaya.MSelectionList()
+    selection_list.add(plug_name)
+    plug = OpenMaya.MPlug()
+    selection_list.getPlug(0, plug)
+    return plug
+
+
+#--------------------------------------------------------------------------------------------------
+# Evaluate plugs at an arbitrary time without changing the current time.
+#--------------------------------------------------------------------------------------------------
+
+def get_time_context(time):
+    return OpenMaya.MDGContext(OpenMaya.MTime(time, OpenMaya.MTime.uiUnit()))
+
+def get_matrix_plug_value(plug, context):
+    matrix = OpenMaya.MFnMatrixData(plug.asMObject(context)).matrix()
+    return matrix_from_mmatrix(matrix)
+
+def matrix_from_mmatrix(matrix):
+    return [matrix(0, 0), matrix(0, 1), matrix(0, 2), matrix(0, 3),
+            matrix(1, 0), matrix(1, 1), matrix(1, 2), matrix(1, 3),
+            matrix(2, 0), matrix(2, 1), matrix(2, 2), matrix(2, 3),
+            matrix(3, 0), matrix(3, 1), matrix(3, 2), matrix(3, 3)]
+
+
 #--------------------------------------------------------------------------------------------------
 # check if a transform or any of its parents are set as visible
 #--------------------------------------------------------------------------------------------------
@@ -266,6 +385,57 @@ def visible_in_hierarchy(parent):
     return True
 
 
+#--------------------------------------------------------------------------------------------------
+# List the attributes the local matrix of a transform or joint depends on, cached by node type.
+#--------------------------------------------------------------------------------------------------
+
+matrix_attributes_by_node_type = dict()
+
+def get_matrix_attributes(node_name, node_type=None):
+    if node_type is None:
+        node_type = cmds.nodeType(node_name)
+
+    attributes = matrix_attributes_by_node_type.get(node_type)
+    if attributes is None:
+        # besides translate, rotate and scale these include the pivots, shear, rotate axis and for joints
+        # the joint orient and inverse scale, compound attributes are listed with their children
+        attributes = set()
+        for attribute in cmds.affects('matrix', node_name) or []:
+            attributes.add(attribute)
+            attributes.update(cmds.attributeQuery(attribute, node=node_name, listChildren=True) or [])
+        attributes = sorted(attributes)
+        matrix_attributes_by_node_type[node_type] = attributes
+
+    return attributes
+
+
+#--------------------------------------------------------------------------------------------------
+# List the joints moved by IK handles, IK solvers set the rotation of the joints without connecting to it.
+#--------------------------------------------------------------------------------------------------
+
+def get_ik_joints():
+    ik_joints = set()
+    for ik_handle in cmds.ls(type='ikHandle') or []:
+        for joint in cmds.ikHandle(ik_handle, query=True, jointList=True) or []:
+            ik_joints.update(cmds.ls(joint, long=True) or [])
+
+        # the joint list stops before the end joint, which some solvers also rotate
+        end_effector = cmds.ikHandle(ik_handle, query=True, endEffector=True)
+        if end_effector:
+            ik_joints.update(cmds.listRelatives(end_effector, parent=True, fullPath=True) or [])
+    return ik_joints
+
+
+#--------------------------------------------------------------------------------------------------
+# Return the modification time of a file, or None if it does not exist.
+#--------------------------------------------------------------------------------------------------
+
+def get_modification_time(file_path):
+    if os.path.exists(file_path):
+        return os.path.getmtime(file_path)
+    return None
+
+
 #--------------------------------------------------------------------------------------------------
 # Check keys on a given attribute are constant.
 #--------------------------------------------------------------------------------------------------
@@ -274,6 +444,9 @@ def keys_are_constant(attr, value=None):
 
     keys = cmds.keyframe(attr, q=True, valueChange=True, absolute=True)
 
+    if keys is None:
+        return True
+
     if value == None:
         value = keys[0]
 
@@ -284,6 +457,29 @@ def keys_are_constant(attr, value=None):
     return True
 
 
+#--------------------------------------------------------------------------------------------------
+# Classify what drives the given attributes of a node.
+# Returns 'static' if nothing drives them, 'constant' if they are only driven by animation curves
+# with constant keys and 'animated' otherwise.
+#--------------------------------------------------------------------------------------------------
+
+def get_animation_state(node_name, attributes):
+    state = 'static'
+
+    for attribute in attributes:
+        attr = node_name + '.' + attribute
+        sources = cmds.listConnections(attr, source=True, destination=False)
+        if sources is None:
+            continue
+
+        if not cmds.nodeType(sources[0]).startswith('animCurve') or not keys_are_constant(attr):
+            return 'animated'
+
+        state = 'constant'
+
+    return state
+
+
 #--------------------------------------------------------------------------------------------------
 # Check if an object has a shader connected.
 #--------------------------------------------------------------------------------------------------
@@ -716,6 +912,9 @@ def warning(message):
     print('#  {0}'.format(message))
 
 def error(message):
+    # under mayapy maya.cmds imports without its commands until maya.standalone is initialized
+    if cmds is None or not hasattr(cmds, 'error'):
+        raise RuntimeError(message)
     cmds.error(message)
 
 
@@ -777,6 +976,149 @@ def matrix_remove_scale(m):
 
     return matrix_multiply(m, inverse_scale)
 
+# returns the axis aligned bounding box, [min x, min y, min z, max x, max y, max z], of a bounding box transformed by m
+def bounding_box_transform(bounding_box, m):
+    corners = []
+    for x in (bounding_box[0], bounding_box[3]):
+        for y in (bounding_box[1], bounding_box[4]):
+            for z in (bounding_box[2], bounding_box[5]):
+                corners.append([x * m[0] + y * m[4] + z * m[ 8] + m[12],
+                                x * m[1] + y * m[5] + z * m[ 9] + m[13],
+                                x * m[2] + y * m[6] + z * m[10] + m[14]])
+
+    return [min([corner[i] for corner in corners]) for i in range(3)] + [max([corner[i] for corner in corners]) for i in range(3)]
+
+# returns the single matrix equivalent to a matrix stack as stored in AsTransform, the last matrix being the innermost one
+def matrix_stack_multiply(matrix_stack):
+    result = matrix_stack[0]
+    for m in matrix_stack[1:]:
+        result = matrix_multiply(m, result)
+    return result
+
+
+# returns the scaling, the rotation as a unit quaternion [x, y, z, w] and the translation of a matrix without shear, or
+# None if the matrix has a null scaling
+def matrix_decompose(m):
+    scale = matrix_get_scale(m)
+    if min(scale) < 1e-12:
+        return None
+
+    # a mirroring matrix is decomposed with a negative x scaling
+    if (m[0] * (m[5] * m[10] - m[6] * m[9]) - m[1] * (m[4] * m[10] - m[6] * m[8]) + m[2] * (m[4] * m[9] - m[5] * m[8])) < 0.0:
+        scale[0] = -scale[0]
+
+    # a[i][j] is the rotation matrix acting on column vectors, the rows of a Maya matrix are the scaled axes
+    a = [[m[4 * j + i] / scale[j] for j in range(3)] for i in range(3)]
+    trace = a[0][0] + a[1][1] + a[2][2]
+    if trace > 0.0:
+        k = 0.5 / math.sqrt(trace + 1.0)
+        rotation = [(a[2][1] - a[1][2]) * k, (a[0][2] - a[2][0]) * k, (a[1][0] - a[0][1]) * k, 0.25 / k]
+    elif a[0][0] > a[1][1] and a[0][0] > a[2][2]:
+        k = 2.0 * math.sqrt(max(1.0 + a[0][0] - a[1][1] - a[2][2], 1e-12))
+        rotation = [0.25 * k, (a[0][1] + a[1][0]) / k, (a[0][2] + a[2][0]) / k, (a[2][1] - a[1][2]) / k]
+    elif a[1][1] > a[2][2]:
+        k = 2.0 * math.sqrt(max(1.0 + a[1][1] - a[0][0] - a[2][2], 1e-12))
+        rotation = [(a[0][1] + a[1][0]) / k, 0.25 * k, (a[1][2] + a[2][1]) / k, (a[0][2] - a[2][0]) / k]
+    else:
+        k = 2.0 * math.sqrt(max(1.0 + a[2][2] - a[0][0] - a[1][1], 1e-12))
+        rotation = [(a[0][2] + a[2][0]) / k, (a[1][2] + a[2][1]) / k, 0.25 * k, (a[1][0] - a[0][1]) / k]
+
+    length = math.sqrt(sum([c * c for c in rotation]))
+    return scale, [c / length for c in rotation], [m[12], m[13], m[14]]
+
+def matrix_compose(scale, rotation, translation):
+    x, y, z, w = rotation
+    a = [[1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - z * w), 2.0 * (x * z + y * w)],
+         [2.0 * (x * y + z * w), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - x * w)],
+         [2.0 * (x * z - y * w), 2.0 * (y * z + x * w), 1.0 - 2.0 * (x * x + y * y)]]
+
+    return [a[0][0] * scale[0], a[1][0] * scale[0], a[2][0] * scale[0], 0.0,
+            a[0][1] * scale[1], a[1][1] * scale[1], a[2][1] * scale[1], 0.0,
+            a[0][2] * scale[2], a[1][2] * scale[2], a[2][2] * scale[2], 0.0,
+            translation[0], translation[1], translation[2], 1.0]
+
+def quaternion_slerp(q0, q1, t):
+    dot = sum([c0 * c1 for c0, c1 in zip(q0, q1)])
+    if dot < 0.0:
+        q1 = [-c for c in q1]
+        dot = -dot
+
+    if dot > 0.9995:
+        q = [c0 + (c1 - c0) * t for c0, c1 in zip(q0, q1)]
+        length = math.sqrt(sum([c * c for c in q]))
+        return [c / length for c in q]
+
+    theta = math.acos(dot)
+    w0 = math.sin((1.0 - t) * theta) / math.sin(theta)
+    w1 = math.sin(t * theta) / math.sin(theta)
+    return [c0 * w0 + c1 * w1 for c0, c1 in zip(q0, q1)]
+
+# interpolates two decomposed matrices the way appleseed interpolates the transforms of a motion blurred
+# instance, the scalings and translations linearly and the rotations along the shortest arc
+def matrix_interpolate(decomposition0, decomposition1, t):
+    scale = [s0 + (s1 - s0) * t for s0, s1 in zip(decomposition0[0], decomposition1[0])]
+    rotation = quaternion_slerp(decomposition0[1], decomposition1[1], t)
+    translation = [t0 + (t1 - t0) * t for t0, t1 in zip(decomposition0[2], decomposition1[2])]
+    return matrix_compose(scale, rotation, translation)
+
+# returns the indices of the matrices to keep so that interpolating between them like appleseed reproduces every
+# other matrix within tolerance, the matrices are samples evenly spaced in time
+def matrices_adaptive_sample_indices(matrices, tolerance):
+    # matrices with a null scaling cannot be interpolated by appleseed, all the samples are kept
+    decompositions = [matrix_decompose(m) for m in matrices]
+    if None in decompositions:
+        return range(len(matrices))
+
+    kept_indices = set([0, len(matrices) - 1])
+    intervals = [(0, len(matrices) - 1)]
+
+    while intervals:
+        start, end = intervals.pop()
+        worst_index = None
+        worst_error = tolerance
+        for i in range(start + 1, end):
+            t = float(i - start) / (end - start)
+            interpolated_matrix = matrix_interpolate(decompositions[start], decompositions[end], t)
+            error = max([abs(interpolated_matrix[j] - matrices[i][j]) for j in range(16)])
+            if error > worst_error:
+                worst_index = i
+                worst_error = error
+
+        if worst_index is not None:
+            kept_indices.add(worst_index)
+            intervals.append((start, worst_index))
+            intervals.append((worst_index, end))
+
+    return sorted(kept_indices)
+
+
+#--------------------------------------------------------------------------------------------------
+# batched matrix functions, they take and return lists of matrices.
+#--------------------------------------------------------------------------------------------------
+
+# multiplies each transform matrix with the matrix of the same index, if either list holds a single
+# matrix it is used for every matrix of the other list
+def matrices_multiply(transform_matrices, matrices):
+    if numpy is not None:
+        transform_array = numpy.array(transform_matrices, dtype=float).reshape(-1, 4, 4)
+        matrix_array = numpy.array(matrices, dtype=float).reshape(-1, 4, 4)
+        return numpy.einsum('...ij,...jk->...ik', transform_array, matrix_array).reshape(-1, 16).tolist()
+
+    if len(transform_matrices) == 1:
+        return [matrix_multiply(transform_matrices[0], m) for m in matrices]
+    if len(matrices) == 1:
+        return [matrix_multiply(transform_matrix, matrices[0]) for transform_matrix in transform_matrices]
+    return [matrix_multiply(transform_matrix, m) for transform_matrix, m in zip(transform_matrices, matrices)]
+
+def matrices_remove_scale(matrices):
+    if numpy is not None:
+        matrix_array = numpy.array(matrices, dtype=float).reshape(-1, 4, 4)
+        inverse_scale = 1.0 / numpy.sqrt((matrix_array[:, :3, :3] ** 2).sum(axis=2))
+        matrix_array[:, :, :3] *= inverse_scale[:, numpy.newaxis, :]
+        return matrix_array.reshape(-1, 16).tolist()
+
+    return [matrix_remove_scale(m) for m in matrices]
+
 
 #--------------------------------------------------------------------------------------------------
 # Normalize a path to the Posix format (using / as directory separator), regardless of the host.
@@ -21,10 +21,16 @@
 # THE SOFTWARE.
 #
 
-import maya.cmds as cmds
-import maya.mel as mel
-import maya.utils as mu
+try:
+    import maya.cmds as cmds
+    import maya.mel as mel
+    import maya.utils as mu
+    import maya.OpenMaya as OpenMaya
+except ImportError:
+    # Maya is not available when a scene cache is translated by tools/translate_scene_cache.py
+    cmds = mel = mu = OpenMaya = None
 import os
+import array
 import time
 import re
 import subprocess
@@ -32,7 +38,15 @@ import sys
 import ms_commands
 reload(ms_commands)
 import ms_export_obj
+import ms_export_session
+import ms_format
+import cStringIO
+import cPickle
 import time
+import multiprocessing
+import tempfile
+import copy
+import zipfile
 
 INCH_TO_METER = 0.02539999983236
 
@@ -42,15 +56,23 @@ INCH_TO_METER = 0.02539999983236
 #--------------------------------------------------------------------------------------------------
 
 class WriteXml():
+
+    """ Writes indented XML, lines are buffered and written to the file in large blocks """
+
     spaces_per_indentation_level = 4
+    buffered_line_count = 4096
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, file_object=None):
         self.indentation_level = 0
-        self.file_object = None
+        self.indentations = ['']
+        self.lines = []
+        self.file_object = file_object
+        if self.file_object is not None:
+            return
         try:
             self.file_object = open(file_path, 'w')
         except IOError:
-            cmds.error("IO error: failed to open {0} for writing.".format(file_path))
+            ms_commands.error("IO error: failed to open {0} for writing.".format(file_path))
 
     def start_element(self, str):
         self.append_line("<" + str + ">")
@@ -64,16 +86,34 @@ class WriteXml():
         self.append_line("<" + str + "/>")
 
     def append_parameter(self, name, value):
-        self.append_line('<parameter name="{0}" value="{1}" />'.format(name, value))
+        self.append_line('<parameter name="%s" value="%s" />' % (name, value))
+
+    def append_matrix(self, m, precision=15):
+        # the row major Maya matrix is written transposed, the four rows are formatted in one go
+        self.start_element('matrix')
+        self.lines.append(ms_format.get_format(4, precision, self.indentation_string(), '\n', 4) % (m[0], m[4], m[ 8], m[12],
+                                                                                                    m[1], m[5], m[ 9], m[13],
+                                                                                                    m[2], m[6], m[10], m[14],
+                                                                                                    m[3], m[7], m[11], m[15]))
+        self.end_element('matrix')
 
     def append_line(self, str):
-        self.file_object.write(self.indentation_string() + str + "\n")
+        self.lines.append(self.indentation_string() + str + "\n")
+        if len(self.lines) >= self.buffered_line_count:
+            self.flush()
+
+    def flush(self):
+        self.file_object.write(''.join(self.lines))
+        self.lines = []
 
     def close(self):
+        self.flush()
         self.file_object.close()
 
     def indentation_string(self):
-        return (self.indentation_level * self.spaces_per_indentation_level) * " "
+        while len(self.indentations) <= self.indentation_level:
+            self.indentations.append((len(self.indentations) * self.spaces_per_indentation_level) * " ")
+        return self.indentations[self.indentation_level]
 
 
 #--------------------------------------------------------------------------------------------------
@@ -204,6 +244,30 @@ def get_maya_params(render_settings_node):
     params['autodetect_alpha'] = cmds.getAttr(render_settings_node + '.autodetect_alpha')
     params['force_linear_texture_interpretation'] = cmds.getAttr(render_settings_node + '.force_linear_texture_interpretation')
     params['force_linear_color_interpretation'] = cmds.getAttr(render_settings_node + '.force_linear_color_interpretation')
+
+    params['dg_context_sampling'] = cmds.getAttr(render_settings_node + '.dg_context_sampling')
+    params['optimize_static_transforms'] = cmds.getAttr(render_settings_node + '.optimize_static_transforms')
+    params['prune_empty_transforms'] = cmds.getAttr(render_settings_node + '.prune_empty_transforms')
+    params['reuse_unedited_nodes'] = cmds.getAttr(render_settings_node + '.reuse_unedited_nodes')
+    params['write_scene_cache'] = cmds.getAttr(render_settings_node + '.write_scene_cache')
+    params['reuse_frame_invariant_entities'] = cmds.getAttr(render_settings_node + '.reuse_frame_invariant_entities')
+    params['collapse_matrix_stacks'] = cmds.getAttr(render_settings_node + '.collapse_matrix_stacks')
+    params['deduplicate_materials'] = cmds.getAttr(render_settings_node + '.deduplicate_materials')
+    params['parallel_translation'] = cmds.getAttr(render_settings_node + '.parallel_translation')
+    params['flatten_assemblies'] = cmds.getAttr(render_settings_node + '.flatten_assemblies')
+    params['partition_static_instances'] = cmds.getAttr(render_settings_node + '.partition_static_instances')
+    params['partition_size'] = cmds.getAttr(render_settings_node + '.partition_size')
+    params['adaptive_motion_samples'] = cmds.getAttr(render_settings_node + '.adaptive_motion_samples')
+    params['motion_sample_tolerance'] = cmds.getAttr(render_settings_node + '.motion_sample_tolerance')
+    params['skip_unchanged_files'] = cmds.getAttr(render_settings_node + '.skip_unchanged_files')
+    params['share_static_data'] = cmds.getAttr(render_settings_node + '.share_static_data')
+    params['package_projects'] = cmds.getAttr(render_settings_node + '.package_projects')
+
+    if cmds.getAttr(render_settings_node + '.scene_walker') == 0:
+        params['scene_walker'] = 'cmds'
+    else:
+        params['scene_walker'] = 'openmaya'
+
     return params
 
 
@@ -222,10 +286,24 @@ def get_maya_scene(params):
     # the Maya scene is stored as a list of root transforms that contain meshes/geometry/lights as children
     maya_root_transforms = []
 
+    # materials, shading nodes and file nodes are shared by every object that uses them,
+    # an export session may already have cached the ones whose Maya nodes were not edited since the previous export
+    params.setdefault('m_node_cache', dict())
+    params.setdefault('unchanged_geometry_files', set())
+
     # find all root transforms and create Mtransforms from them
-    for maya_transform in cmds.ls(tr=True, long=True):
-        if not cmds.listRelatives(maya_transform, ap=True, fullPath=True):
-            maya_root_transforms.append(MTransform(params, maya_transform, None))
+    if params['scene_walker'] == 'openmaya':
+        maya_root_transforms = walk_maya_scene(params)
+    else:
+        for maya_transform in cmds.ls(tr=True, long=True):
+            if not cmds.listRelatives(maya_transform, ap=True, fullPath=True):
+                maya_root_transforms.append(MTransform(params, maya_transform, None))
+
+    # drop rig controls, locators, joints and empty groups so they are not sampled
+    if params['prune_empty_transforms']:
+        transform_count = len(list_m_transforms(maya_root_transforms))
+        maya_root_transforms = prune_empty_transforms(maya_root_transforms)
+        ms_commands.info("Pruned {0} transforms without meshes, lights or cameras.".format(transform_count - len(list_m_transforms(maya_root_transforms))))
 
     start_frame = int(start_time)
     end_frame = start_frame
@@ -249,10 +327,26 @@ def get_maya_scene(params):
     params['output_directory'] = params['output_directory'].replace("<ProjectDir>", project_directory)
     params['output_directory'] = params['output_directory'].replace("<SceneName>", scene_basename)
 
+    # keep the scene state translate_maya_scene() needs so it can run without Maya
+    params['current_frame'] = start_frame
+    params['scene_basename'] = scene_basename
+    params['project_directory'] = project_directory
+
     texture_dir = '_textures'
     ms_commands.create_dir(os.path.join(params['output_directory'], texture_dir))
     geo_dir = '_geometry'
-    ms_commands.create_dir(os.path.join(params['output_directory'], geo_dir))
+
+    # packaged projects hold their geometry, it is kept in memory until the packages are saved instead of being
+    # written to the output directory, the OBJ data is keyed by its path in the packages
+    if params['package_projects']:
+        params['packaged_files'] = dict()
+    else:
+        ms_commands.create_dir(os.path.join(params['output_directory'], geo_dir))
+
+    # the content hashes of the files written by previous exports are kept next to them, this manifest
+    # replaces the one of the export session as it also knows the files written by earlier Maya sessions
+    if params['skip_unchanged_files']:
+        params['file_manifest'] = ms_export_session.FileManifest(params['output_directory'])
 
     # get environment
     environment = None
@@ -260,20 +354,54 @@ def get_maya_scene(params):
         environment = MMsEnvironment(params, params['environment'])
         environment.add_environment_sample(params['output_directory'], texture_dir, 0)
 
+    # find the transforms that only need to be sampled once
+    if params['optimize_static_transforms']:
+        ik_joints = ms_commands.get_ik_joints()
+        for transform in maya_root_transforms:
+            classify_transform_animation(transform, ik_joints)
+
     # add motion samples
     current_frame = start_frame
     frame_sample_number = 1
+    needs_timeline = False
+    for transform in maya_root_transforms:
+        needs_timeline = needs_timeline or scene_needs_timeline(transform)
+    m_transforms = list_m_transforms(maya_root_transforms)
+
+    # after the start frame only deforming meshes are exported again
+    has_deforming_meshes = False
+    for m_transform in m_transforms:
+        for mesh in m_transform.child_meshes:
+            has_deforming_meshes = has_deforming_meshes or mesh.has_deformation
 
     while current_frame <= end_frame:
         ms_commands.info("Adding motion samples, frame {0}...".format(current_frame))
 
-        cmds.currentTime(current_frame)
-
         # determine if this is the first sample of a frame
         initial_sample = (frame_sample_number == 1)
 
+        # when sampling through a DG context, transforms, visibility and cameras are evaluated at the sample time
+        # directly and the timeline is only moved for the samples that export geometry or bake textures
+        context = None
+        if params['dg_context_sampling']:
+            context = ms_commands.get_time_context(current_frame)
+            if initial_sample and (current_frame == start_frame or needs_timeline):
+                cmds.currentTime(current_frame)
+        else:
+            cmds.currentTime(current_frame)
+
+        # with the OpenMaya scene walker all matrices are captured in one batched pass over the cached transforms
+        if params['scene_walker'] == 'openmaya':
+            add_transform_samples(m_transforms, params['export_transformation_blur'], params['export_camera_blur'], initial_sample, context)
+
+        # geometry is only exported on the first sample of a frame, resolve the visibility of the whole DAG once for it
+        # when some mesh is exported on this sample
+        visibility_table = None
+        if initial_sample and (current_frame == start_frame or has_deforming_meshes):
+            visibility_table = resolve_visibility(maya_root_transforms, dict(), context)
+
         for transform in maya_root_transforms:
-            add_scene_sample(transform, params['export_transformation_blur'], params['export_deformation_blur'], params['export_camera_blur'], current_frame, start_frame, frame_sample_number, initial_sample, params['output_directory'], geo_dir, texture_dir)
+            add_scene_sample(transform, params['export_transformation_blur'], params['export_deformation_blur'], params['export_camera_blur'], current_frame, start_frame, frame_sample_number, initial_sample, params['output_directory'], geo_dir, texture_dir, context, params['scene_walker'] != 'openmaya', visibility_table)
 
         frame_sample_number += 1
         if frame_sample_number == params['motion_samples']:
@@ -286,27 +414,104 @@ def get_maya_scene(params):
     # return to pre-export time
     cmds.currentTime(start_time)
 
+    for m_transform in m_transforms:
+        for camera in m_transform.child_cameras:
+            camera.remove_matrix_scale()
+
     return maya_root_transforms, environment
 
 
+#--------------------------------------------------------------------------------------------------
+# walk_maya_scene function.
+#--------------------------------------------------------------------------------------------------
+
+def walk_maya_scene(params):
+
+    """ Builds the same MTransform hierarchy as the listRelatives based code path in a single traversal of the DAG """
+
+    maya_root_transforms = []
+    m_transforms = dict()
+
+    dag_iterator = OpenMaya.MItDag(OpenMaya.MItDag.kDepthFirst)
+
+    while not dag_iterator.isDone():
+        dag_path = OpenMaya.MDagPath()
+        dag_iterator.getPath(dag_path)
+        dag_iterator.next()
+
+        # skip the world node
+        if dag_path.length() == 0:
+            continue
+
+        full_path = dag_path.fullPathName()
+        parent = m_transforms.get(full_path.rsplit('|', 1)[0])
+
+        if dag_path.hasFn(OpenMaya.MFn.kTransform):
+            m_transform = MTransform(params, full_path, parent, dag_path)
+            m_transforms[full_path] = m_transform
+            if parent is None:
+                maya_root_transforms.append(m_transform)
+            else:
+                parent.has_children = True
+                parent.child_transforms.append(m_transform)
+
+        # shapes are only of interest if they are parented to a transform we are caching
+        elif parent is None:
+            continue
+
+        elif dag_path.hasFn(OpenMaya.MFn.kMesh):
+            parent.has_children = True
+            if ms_commands.dag_node_is_visible(dag_path):
+                parent.child_meshes.append(MMesh(params, full_path, parent))
+
+        elif dag_path.hasFn(OpenMaya.MFn.kLight):
+            parent.has_children = True
+            if dag_path.apiType() in (OpenMaya.MFn.kPointLight, OpenMaya.MFn.kSpotLight):
+                parent.child_lights.append(MLight(params, full_path, parent))
+
+        elif dag_path.hasFn(OpenMaya.MFn.kCamera):
+            parent.has_children = True
+            parent.child_cameras.append(MCamera(params, full_path, parent))
+
+    return maya_root_transforms
+
+
+#--------------------------------------------------------------------------------------------------
+# prune_empty_transforms function.
+#--------------------------------------------------------------------------------------------------
+
+def prune_empty_transforms(m_transforms):
+
+    """ removes the transforms that have no mesh, light or camera anywhere below them and returns the remaining ones """
+
+    # children are pruned first so a transform is only kept if it is the ancestor of something exportable
+    kept_transforms = []
+    for m_transform in m_transforms:
+        m_transform.child_transforms = prune_empty_transforms(m_transform.child_transforms)
+        if m_transform.child_transforms or m_transform.child_meshes or m_transform.child_lights or m_transform.child_cameras:
+            kept_transforms.append(m_transform)
+
+    return kept_transforms
+
+
 #--------------------------------------------------------------------------------------------------
 # add_scene_sample function.
 # TODO: needs mechanism to sample frames for camera and transforms on whole frame numbers for non mb scenes
 #--------------------------------------------------------------------------------------------------
 
-def add_scene_sample(m_transform, transform_blur, deform_blur, camera_blur, current_frame, start_frame, frame_sample_number, initial_sample, export_root, geo_dir, tex_dir):
+def add_scene_sample(m_transform, transform_blur, deform_blur, camera_blur, current_frame, start_frame, frame_sample_number, initial_sample, export_root, geo_dir, tex_dir, context=None, sample_matrices=True, visibility_table=None):
 
-    if transform_blur or initial_sample:
-        m_transform.add_transform_sample()
+    if sample_matrices and (transform_blur or initial_sample):
+        m_transform.add_transform_sample(context)
         if (frame_sample_number == 1) or initial_sample:
-            m_transform.add_visibility_sample()
+            m_transform.add_visibility_sample(context)
 
     if deform_blur or initial_sample:
         for mesh in m_transform.child_meshes:
             # Only add a sample if this is the first frame to be exported or if it has some deformation
             if mesh.has_deformation or (current_frame == start_frame):
                 if initial_sample:
-                    mesh.add_deform_sample(export_root, geo_dir, current_frame)
+                    mesh.add_deform_sample(export_root, geo_dir, current_frame, visibility_table)
 
     for mesh in m_transform.child_meshes:
         if (frame_sample_number == 1) or initial_sample:
@@ -325,31 +530,286 @@ def add_scene_sample(m_transform, transform_blur, deform_blur, camera_blur, curr
                 light.color.add_image_sample(export_root, tex_dir, current_frame) 
 
     for camera in m_transform.child_cameras:
-        if camera_blur or initial_sample or (frame_sample_number == 1):
-            camera.add_matrix_sample()
+        if sample_matrices and (camera_blur or initial_sample or (frame_sample_number == 1)):
+            camera.add_matrix_sample(context)
         if frame_sample_number == 1:
-            camera.add_focal_distance_sample()
-            camera.add_focal_length_sample()
+            camera.add_focal_distance_sample(context)
+            camera.add_focal_length_sample(context)
 
     for transform in m_transform.child_transforms:
-        add_scene_sample(transform, transform_blur, deform_blur, camera_blur, current_frame, start_frame, frame_sample_number, initial_sample, export_root, geo_dir, tex_dir)
+        add_scene_sample(transform, transform_blur, deform_blur, camera_blur, current_frame, start_frame, frame_sample_number, initial_sample, export_root, geo_dir, tex_dir, context, sample_matrices, visibility_table)
+
+
+#--------------------------------------------------------------------------------------------------
+# add_transform_samples function.
+#--------------------------------------------------------------------------------------------------
+
+def add_transform_samples(m_transforms, transform_blur, camera_blur, initial_sample, context=None):
+
+    """ adds local matrix and visibility samples to every cached transform and world space samples to every camera in a single pass over OpenMaya plugs """
+
+    if context is None:
+        context = OpenMaya.MDGContext.fsNormal
+
+    for m_transform in m_transforms:
+        if transform_blur or initial_sample:
+            m_transform.add_transform_sample(context)
+            if initial_sample:
+                m_transform.add_visibility_sample(context)
+
+        if camera_blur or initial_sample:
+            for camera in m_transform.child_cameras:
+                camera.add_matrix_sample(context)
+
+
+#--------------------------------------------------------------------------------------------------
+# resolve_visibility function.
+#--------------------------------------------------------------------------------------------------
+
+def resolve_visibility(m_transforms, visibility_table, context=None, parent_is_visible=True):
+
+    """ fills visibility_table with the effective visibility of every cached transform and mesh, visiting each DAG node once """
+
+    for m_transform in m_transforms:
+        # the descendents of a hidden transform are hidden so their attributes are never queried
+        is_visible = parent_is_visible and ms_commands.dag_node_is_visible(m_transform.get_dag_path(), context)
+        visibility_table[m_transform.name] = is_visible
+
+        # like visible_in_hierarchy() a mesh only depends on the ancestors of its transform, the visibility of the
+        # transform itself is exported with its visibility samples
+        for mesh in m_transform.child_meshes:
+            visibility_table[mesh.name] = parent_is_visible
+
+        resolve_visibility(m_transform.child_transforms, visibility_table, context, is_visible)
+
+    return visibility_table
+
+
+#--------------------------------------------------------------------------------------------------
+# classify_transform_animation function.
+#--------------------------------------------------------------------------------------------------
+
+def classify_transform_animation(m_transform, ik_joints, parent_is_static=True):
+
+    """ classifies a transform hierarchy as static, keyed but constant or animated and marks static samples as constant """
+
+    # joints compensate the scale of their parent joint through a connection to it, so they move with an animated parent
+    attributes = [attribute for attribute in m_transform.animation_attributes if attribute != 'inverseScale']
+    inverse_scale_is_connected = len(attributes) < len(m_transform.animation_attributes) and \
+                                 cmds.listConnections(m_transform.name + '.inverseScale', source=True, destination=False) is not None
+
+    if m_transform.name in ik_joints or (inverse_scale_is_connected and not parent_is_static):
+        m_transform.animation_state = 'animated'
+    elif m_transform.is_animated:
+        m_transform.animation_state = ms_commands.get_animation_state(m_transform.name, attributes)
+    else:
+        m_transform.animation_state = 'static'
+
+    # keyed but constant transforms are treated exactly like static ones
+    m_transform.is_animated = m_transform.animation_state == 'animated'
+    m_transform.hierarchy_is_static = parent_is_static and not m_transform.is_animated
+
+    m_transform.matrices.is_constant = not m_transform.is_animated
+    m_transform.visibility_states.is_constant = not m_transform.is_animated
+
+    # camera world space matrices also depend on the ancestors
+    for camera in m_transform.child_cameras:
+        camera.world_space_matrices.is_constant = m_transform.hierarchy_is_static
+
+    for transform in m_transform.child_transforms:
+        classify_transform_animation(transform, ik_joints, m_transform.hierarchy_is_static)
+
+
+#--------------------------------------------------------------------------------------------------
+# list_m_transforms function.
+#--------------------------------------------------------------------------------------------------
+
+def list_m_transforms(maya_root_transforms):
+
+    """ returns a flat, depth first list of all the transforms in the cached Maya scene """
+
+    m_transforms = []
+    for m_transform in maya_root_transforms:
+        m_transforms.append(m_transform)
+        m_transforms += list_m_transforms(m_transform.child_transforms)
+
+    return m_transforms
+
+
+#--------------------------------------------------------------------------------------------------
+# index_maya_scene function.
+#--------------------------------------------------------------------------------------------------
+
+def index_maya_scene(maya_root_transforms):
+
+    """ returns a dict mapping the full DAG paths of the cached transforms, meshes, lights and cameras to their M objects """
+
+    dag_path_index = dict()
+    for m_transform in list_m_transforms(maya_root_transforms):
+        dag_path_index[m_transform.name] = m_transform
+        for child in m_transform.child_meshes + m_transform.child_lights + m_transform.child_cameras:
+            dag_path_index[child.name] = child
+
+    return dag_path_index
+
+
+#--------------------------------------------------------------------------------------------------
+# scene_needs_timeline function.
+#--------------------------------------------------------------------------------------------------
+
+def scene_needs_timeline(m_transform):
+
+    """ returns True if sampling the hierarchy needs the current time to be set, i.e. it has deforming meshes or baked textures """
+
+    for mesh in m_transform.child_meshes:
+        if mesh.has_deformation:
+            return True
+        for material in mesh.ms_materials + mesh.generic_materials:
+            for texture in material.textures:
+                if texture.node_type != 'file':
+                    return True
+
+    for light in m_transform.child_lights:
+        if light.color.__class__.__name__ == 'MFile' and light.color.node_type != 'file':
+            return True
+
+    for transform in m_transform.child_transforms:
+        if scene_needs_timeline(transform):
+            return True
+
+    return False
 
 
 #--------------------------------------------------------------------------------------------------
 # m_file_from_color_connection function.
 #--------------------------------------------------------------------------------------------------
 
-def m_file_from_color_connection(params, m_color_connection):
+def m_file_from_color_connection(params, m_color_connection, use_m_node_cache=True):
     if m_color_connection.connected_node:
         if m_color_connection.connected_node_type == 'file':
-            return MFile(params, m_color_connection.connected_node)
+            args = (m_color_connection.connected_node,)
         else:
             node_name, attr_name = m_color_connection.name.split('.')
-            return MFile(params, None, node_name, attr_name)
+            args = (None, node_name, attr_name)
+
+        if use_m_node_cache:
+            return get_m_node(params, MFile, *args)
+        return MFile(params, *args)
 
     return None
 
 
+#--------------------------------------------------------------------------------------------------
+# get_m_node function.
+#--------------------------------------------------------------------------------------------------
+
+def get_m_node(params, m_class, *args):
+
+    """ returns the M object cached for the given Maya node during this export, creating it the first time the node is seen """
+
+    key = (m_class.__name__,) + args
+    m_node_cache = params['m_node_cache']
+    if key not in m_node_cache:
+        m_node_cache[key] = m_class(params, *args)
+
+    return m_node_cache[key]
+
+
+#--------------------------------------------------------------------------------------------------
+# get_m_node_dependencies function.
+#--------------------------------------------------------------------------------------------------
+
+def get_m_node_dependencies(m_node):
+
+    """ returns the names of the Maya nodes a cached material, shading node or file node was built from and the modification
+        times of the images its file nodes read, or None if it can't be reused """
+
+    dependencies = set()
+    image_times = dict()
+    for node in [m_node] + getattr(m_node, 'shading_nodes', []) + getattr(m_node, 'child_shading_nodes', []) + getattr(m_node, 'textures', []):
+        if node is None:
+            continue
+        if node.__class__.__name__ == 'MFile':
+            # animated textures are sampled again on every export
+            if node.is_animated:
+                return None
+            if node.node_type != 'file':
+                dependencies.add(node.source_node)
+                continue
+            # images edited on disk are converted again
+            if node.source_image_name is not None:
+                image_times[node.source_image_name] = ms_commands.get_modification_time(node.source_image_name)
+        dependencies.add(node.name)
+
+    return dependencies, image_times
+
+
+#--------------------------------------------------------------------------------------------------
+# get_export_session_data function.
+#--------------------------------------------------------------------------------------------------
+
+def get_export_session_data(params, maya_root_transforms):
+
+    """ returns the reusable M node cache entries with their dependencies and image times and the geometry files of non deforming meshes """
+
+    m_node_cache = dict()
+    for key, m_node in params['m_node_cache'].items():
+        dependencies = get_m_node_dependencies(m_node)
+        if dependencies is not None:
+            m_node_cache[key] = (m_node,) + dependencies
+
+    geometry_files = dict()
+    for m_transform in list_m_transforms(maya_root_transforms):
+        for mesh in m_transform.child_meshes:
+            if not mesh.has_deformation:
+                geometry_files[mesh.name] = [os.path.join(params['output_directory'], file_name) for file_name in mesh.mesh_file_names if file_name is not None]
+
+    return m_node_cache, geometry_files
+
+
+#--------------------------------------------------------------------------------------------------
+# MSampleArray class.
+#--------------------------------------------------------------------------------------------------
+
+class MSampleArray():
+
+    """ Compact storage for a sequence of samples, each sample being a single value or a fixed size block such as a matrix """
+
+    def __init__(self, width=1, typecode='d'):
+        self.width = width
+        self.typecode = typecode
+        self.clear()
+
+        # a constant array only holds one sample which is returned for any index
+        self.is_constant = False
+
+    def clear(self):
+        # single values are stored in an array, blocks as tuples which are returned without being copied
+        if self.width == 1:
+            self.data = array.array(self.typecode)
+        else:
+            self.data = []
+
+    def append(self, sample):
+        if self.width == 1:
+            self.data.append(sample)
+        else:
+            self.data.append(tuple(sample))
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        if self.is_constant:
+            return self.data[0]
+        return self.data[index]
+
+    def samples_are_equal(self):
+        if self.is_constant or len(self) < 2:
+            return True
+        return self.data.count(self.data[0]) == len(self.data)
+
+
 #--------------------------------------------------------------------------------------------------
 # MTransform class.
 #--------------------------------------------------------------------------------------------------
@@ -358,11 +818,13 @@ class MTransform():
 
     """ Lightweight class representing info for a Maya transform node """
 
-    def __init__(self, params, maya_transform_name, parent):
+    def __init__(self, params, maya_transform_name, parent, dag_path=None):
         self.params = params
         self.name = maya_transform_name
         self.safe_name = ms_commands.legalize_name(self.name)
         self.parent = parent
+        self.dag_path = dag_path
+        self.plugs = dict()
 
         # child attributes
         self.child_cameras = []
@@ -373,16 +835,24 @@ class MTransform():
         self.has_children = False
 
         # sample attributes
-        self.matrices = []
-        self.visibility_states = []
+        self.matrices = MSampleArray(16)
+        self.visibility_states = MSampleArray(1, 'b')
+
+        # set by classify_transform_animation()
+        self.animation_state = None
+        self.hierarchy_is_static = False
+
+        # when a DAG path is given the transform was found by walk_maya_scene() which also adds the children
+        if self.dag_path is not None:
+            node_type = OpenMaya.MFnDependencyNode(self.dag_path.node()).typeName()
+            self.animation_attributes = ms_commands.get_matrix_attributes(self.name, node_type) + ['visibility']
+            self.is_animated = ms_commands.has_connections(self.dag_path.node(), self.animation_attributes)
+            return
 
         #check for incoming connections to transform attributes and set the is_animated var
+        self.animation_attributes = ms_commands.get_matrix_attributes(self.name) + ['visibility']
         self.is_animated = False
-        maya_transform_attribute_list = ['translate', 'translateX', 'translateY', 'translateZ',
-                                         'rotate', 'rotateX', 'rotateY', 'rotateZ',
-                                         'scale','scaleX','scaleY','scaleZ', 'visibility']
-
-        for attribute in maya_transform_attribute_list:
+        for attribute in self.animation_attributes:
             if cmds.listConnections(self.name + '.' + attribute) is not None:
                 self.is_animated = True
                 break
@@ -414,11 +884,41 @@ class MTransform():
             for transform_name in transform_names:
                 self.child_transforms.append(MTransform(params, transform_name, self))
 
-    def add_transform_sample(self):
-        self.matrices.append(cmds.xform(self.name, query=True, matrix=True))
+    def __getstate__(self):
+        # OpenMaya objects can't be pickled, they are looked up again when needed
+        state = self.__dict__.copy()
+        state['dag_path'] = None
+        state['plugs'] = dict()
+        return state
+
+    def get_dag_path(self):
+        if self.dag_path is None:
+            self.dag_path = ms_commands.get_dag_path(self.name)
+        return self.dag_path
+
+    def get_plug(self, attribute_name):
+        if attribute_name not in self.plugs:
+            self.plugs[attribute_name] = ms_commands.get_plug(self.name + '.' + attribute_name)
+        return self.plugs[attribute_name]
+
+    def add_transform_sample(self, context=None):
+        # static transforms are sampled once and the sample is reused for every frame
+        if self.matrices.is_constant and len(self.matrices) > 0:
+            return
+
+        if context is None:
+            self.matrices.append(cmds.xform(self.name, query=True, matrix=True))
+        else:
+            self.matrices.append(ms_commands.get_matrix_plug_value(self.get_plug('matrix'), context))
 
-    def add_visibility_sample(self):
-        self.visibility_states.append(cmds.getAttr(self.name + '.visibility'))
+    def add_visibility_sample(self, context=None):
+        if self.visibility_states.is_constant and len(self.visibility_states) > 0:
+            return
+
+        if context is None:
+            self.visibility_states.append(cmds.getAttr(self.name + '.visibility'))
+        else:
+            self.visibility_states.append(self.get_plug('visibility').asBool(context))
 
 
 #--------------------------------------------------------------------------------------------------
@@ -436,6 +936,25 @@ class MTransformChild():
         self.safe_name = ms_commands.legalize_name(self.name)
         self.safe_short_name = ms_commands.legalize_name(self.short_name)
         self.transform = MTransform_object
+        self.dag_path = None
+        self.plugs = dict()
+
+    def __getstate__(self):
+        # OpenMaya objects can't be pickled, they are looked up again when needed
+        state = self.__dict__.copy()
+        state['dag_path'] = None
+        state['plugs'] = dict()
+        return state
+
+    def get_dag_path(self):
+        if self.dag_path is None:
+            self.dag_path = ms_commands.get_dag_path(self.name)
+        return self.dag_path
+
+    def get_plug(self, attribute_name):
+        if attribute_name not in self.plugs:
+            self.plugs[attribute_name] = ms_commands.get_plug(self.name + '.' + attribute_name)
+        return self.plugs[attribute_name]
 
 
 #--------------------------------------------------------------------------------------------------
@@ -464,33 +983,79 @@ class MMesh(MTransformChild):
             ms_commands.info("{0} has deformation.".format(self.name))
             self.has_deformation = True
 
+        # object space bounds of non deforming meshes, used to spatially partition static object instances
+        self.bounding_box = None
+        if params['partition_static_instances'] and not self.has_deformation:
+            self.bounding_box = list(cmds.getAttr(self.name + '.boundingBoxMin')[0] + cmds.getAttr(self.name + '.boundingBoxMax')[0])
+
         attached_material_names = ms_commands.get_attached_materials(self.name)
 
         if attached_material_names is not None:
             for material_name in attached_material_names:
                 if cmds.nodeType(material_name) == 'ms_appleseed_material':
-                    self.ms_materials.append(MMsMaterial(self.params, material_name))
+                    self.ms_materials.append(get_m_node(self.params, MMsMaterial, material_name))
                 else:
-                    self.generic_materials.append(MGenericMaterial(self.params, material_name))
+                    self.generic_materials.append(get_m_node(self.params, MGenericMaterial, material_name))
 
-    def add_deform_sample(self, export_root, geo_dir, time):
+    def add_deform_sample(self, export_root, geo_dir, time, visibility_table=None):
         # if the shape current transform is visible, export;
         # otherwise skip export and just append a null
-        if ms_commands.visible_in_hierarchy(self.transform.name):
+        if visibility_table is not None:
+            is_visible = visibility_table[self.name]
+        else:
+            is_visible = ms_commands.visible_in_hierarchy(self.transform.name)
+
+        if is_visible:
             file_name = '%s_%i_%i.obj' % (self.safe_short_name, self.id, time)
             output_file_path = os.path.join(geo_dir, file_name)
 
             # set file path as relative value
             self.mesh_file_names.append(output_file_path)
 
-            # export mesh using absolute file path
-            absolute_file_path = os.path.join(export_root, output_file_path)
-            if not os.path.exists(absolute_file_path) or self.params['overwrite_existing_geometry']:
-                self.params['obj_exporter'](self.name, absolute_file_path, overwrite=True)
+            if 'packaged_files' in self.params:
+                member_name = output_file_path.replace('\\', '/')
+                if member_name not in self.params['packaged_files']:
+                    self.params['packaged_files'][member_name] = export_obj_data(self.params, self.name)
+            else:
+                # export mesh using absolute file path, meshes not edited since the previous export keep their file
+                absolute_file_path = os.path.join(export_root, output_file_path)
+                file_is_unchanged = absolute_file_path in self.params['unchanged_geometry_files']
+                if not os.path.exists(absolute_file_path) or (self.params['overwrite_existing_geometry'] and not file_is_unchanged):
+                    if 'file_manifest' in self.params:
+                        self.params['file_manifest'].export_file(absolute_file_path, lambda file_path: self.params['obj_exporter'](self.name, file_path, overwrite=True))
+                    else:
+                        self.params['obj_exporter'](self.name, absolute_file_path, overwrite=True)
         else:
             self.mesh_file_names.append(None)
 
 
+#--------------------------------------------------------------------------------------------------
+# export_obj_data function.
+#--------------------------------------------------------------------------------------------------
+
+def export_obj_data(params, mesh_name):
+
+    """ returns the OBJ data of a mesh, the Python exporter writes it to a buffer, the native exporter can only write a file """
+
+    if params['obj_exporter'] is ms_export_obj.export:
+        file_object = cStringIO.StringIO()
+        ms_export_obj.write(mesh_name, file_object)
+        return file_object.getvalue()
+
+    file_descriptor, temp_file_path = tempfile.mkstemp(suffix='.obj')
+    os.close(file_descriptor)
+
+    try:
+        params['obj_exporter'](mesh_name, temp_file_path, overwrite=True)
+        file_object = open(temp_file_path, 'rb')
+        obj_data = file_object.read()
+        file_object.close()
+    finally:
+        os.remove(temp_file_path)
+
+    return obj_data
+
+
 #--------------------------------------------------------------------------------------------------
 # MLight class.
 #--------------------------------------------------------------------------------------------------
@@ -503,7 +1068,7 @@ class MLight(MTransformChild):
         MTransformChild.__init__(self, params, maya_light_name, MTransform_object)
         self.color = MColorConnection(self.params, self.name + '.color')
         if self.color.connected_node is not None:
-            self.color = MFile(self.params, self.color.connected_node)
+            self.color = get_m_node(self.params, MFile, self.color.connected_node)
         self.multiplier = cmds.getAttr(self.name+'.intensity')
         self.decay = cmds.getAttr(self.name+'.decayRate')
         self.model = cmds.nodeType(self.name)
@@ -527,32 +1092,61 @@ class MCamera(MTransformChild):
         # of the main assembly. For this reason we include the world space matrix as an attribute of the camera's
         # transform even though it's not a 'correct' representation of the Maya scene.
 
-        self.world_space_matrices = []
+        self.world_space_matrices = MSampleArray(16)
         self.dof = cmds.getAttr(self.name + '.depthOfField')
-        self.focal_distance_values = []
-        self.focal_length_values = []
+        self.focal_distance_values = MSampleArray()
+        self.focal_length_values = MSampleArray()
         self.focus_region_scale = cmds.getAttr(self.name + '.focusRegionScale')
         self.f_stop = self.focus_region_scale * cmds.getAttr(self.name + '.fStop')
 
-        maya_resolution_aspect = float(self.params['output_res_width']) / float(self.params['output_res_height'])
-        maya_film_aspect = cmds.getAttr(self.name + '.horizontalFilmAperture') / cmds.getAttr(self.name + '.verticalFilmAperture')
+        self.horizontal_film_aperture = float(cmds.getAttr(self.name + '.horizontalFilmAperture'))
+        self.vertical_film_aperture = float(cmds.getAttr(self.name + '.verticalFilmAperture'))
+
+    def get_film_dimensions(self, output_res_width, output_res_height):
+        # computed at translation time so a cached scene can be translated at another resolution
+        maya_resolution_aspect = float(output_res_width) / float(output_res_height)
+        maya_film_aspect = self.horizontal_film_aperture / self.vertical_film_aperture
 
         if maya_resolution_aspect > maya_film_aspect:
-            self.film_width = float(cmds.getAttr(self.name + '.horizontalFilmAperture')) * INCH_TO_METER * 100
-            self.film_height = self.film_width / maya_resolution_aspect
+            film_width = self.horizontal_film_aperture * INCH_TO_METER * 100
+            film_height = film_width / maya_resolution_aspect
         else:
-            self.film_height = float(cmds.getAttr(self.name + '.verticalFilmAperture')) * INCH_TO_METER * 100
-            self.film_width = self.film_height * maya_resolution_aspect
+            film_height = self.vertical_film_aperture * INCH_TO_METER * 100
+            film_width = film_height * maya_resolution_aspect
+
+        return film_width, film_height
 
-    def add_matrix_sample(self):
-        world_space_matrix = cmds.xform(self.transform.name, query=True, matrix=True, ws=True)
-        self.world_space_matrices.append(ms_commands.matrix_remove_scale(world_space_matrix))
+    def add_matrix_sample(self, context=None):
+        if self.world_space_matrices.is_constant and len(self.world_space_matrices) > 0:
+            return
 
-    def add_focal_distance_sample(self):
-        self.focal_distance_values.append(cmds.getAttr(self.name + '.focusDistance'))
+        if context is None:
+            world_space_matrix = cmds.xform(self.transform.name, query=True, matrix=True, ws=True)
+        else:
+            instance_number = self.transform.get_dag_path().instanceNumber()
+            world_matrix_plug = self.transform.get_plug('worldMatrix').elementByLogicalIndex(instance_number)
+            world_space_matrix = ms_commands.get_matrix_plug_value(world_matrix_plug, context)
+        self.world_space_matrices.append(world_space_matrix)
+
+    def remove_matrix_scale(self):
+        # the scale of the sampled world space matrices is removed in one batch once sampling is done
+        sample_count = len(self.world_space_matrices)
+        matrices = [self.world_space_matrices[i] for i in range(sample_count)]
+        self.world_space_matrices.clear()
+        for matrix in ms_commands.matrices_remove_scale(matrices):
+            self.world_space_matrices.append(matrix)
+
+    def add_focal_distance_sample(self, context=None):
+        if context is None:
+            self.focal_distance_values.append(cmds.getAttr(self.name + '.focusDistance'))
+        else:
+            self.focal_distance_values.append(self.get_plug('focusDistance').asDouble(context))
 
-    def add_focal_length_sample(self):
-        self.focal_length_values.append(float(cmds.getAttr(self.name + '.focalLength')) / 10)
+    def add_focal_length_sample(self, context=None):
+        if context is None:
+            self.focal_length_values.append(float(cmds.getAttr(self.name + '.focalLength')) / 10)
+        else:
+            self.focal_length_values.append(self.get_plug('focalLength').asDouble(context) / 10)
 
 
 #--------------------------------------------------------------------------------------------------
@@ -566,6 +1160,8 @@ class MFile():
     def __init__(self, params, maya_file_node, source_node=False, attribute=False):
         self.params = params
         self.image_file_names = []
+        self.last_sample_time = None
+        self.source_image_name = None
         self.node_type = cmds.nodeType(maya_file_node)
         
         if self.node_type == 'file':
@@ -598,8 +1194,15 @@ class MFile():
             self.has_uv_placement = False
 
     def add_image_sample(self, export_root, texture_dir, time):
+        # file nodes are shared between materials so only sample once per time,
+        # and only once in total if the image does not change over time
+        if self.last_sample_time == time or (not self.is_animated and len(self.image_file_names) > 0):
+            return
+        self.last_sample_time = time
+
         if self.node_type == 'file':
             image_name = ms_commands.get_file_texture_name(self.name, time)
+            self.source_image_name = image_name
         else:
             image_name = ms_commands.convert_connection_to_image(self.source_node, self.attribute, os.path.join(export_root, texture_dir, ('{0}_{1}.iff'.format(self.name, time))))
 
@@ -653,7 +1256,8 @@ class MMsEnvironment():
     def get_connections(self, attr_name):
         connection = MColorConnection(self.params, attr_name)
         if connection.connected_node is not None:
-            return m_file_from_color_connection(self.params, connection)
+            # environment maps are sampled separately from the per frame texture samples so they are not shared
+            return m_file_from_color_connection(self.params, connection, use_m_node_cache=False)
         
         return None
 
@@ -754,14 +1358,14 @@ class MMsMaterial():
             return None
 
         if connection.connected_node_type == 'ms_appleseed_shading_node':
-            shading_node = MMsShadingNode(self.params, connection.connected_node)
+            shading_node = get_m_node(self.params, MMsShadingNode, connection.connected_node)
             self.shading_nodes = self.shading_nodes + [shading_node] + shading_node.child_shading_nodes
             self.colors += shading_node.colors
             self.textures += shading_node.textures
             return shading_node
 
         elif connection.connected_node_type == 'file':
-            texture_node = MFile(self.params, connection.connected_node)
+            texture_node = get_m_node(self.params, MFile, connection.connected_node)
             self.textures += [texture_node]
             return texture_node
 
@@ -874,7 +1478,7 @@ class MMsShadingNode():
                 if color_connection.connected_node:
                     # if the node is an appleseed shading node
                     if color_connection.connected_node_type == 'ms_appleseed_shading_node':
-                        shading_node = MMsShadingNode(self.params, color_connection.connected_node)
+                        shading_node = get_m_node(self.params, MMsShadingNode, color_connection.connected_node)
                         self.attributes[attribute_key] = shading_node
                         self.child_shading_nodes += [shading_node] + shading_node.child_shading_nodes
                         self.colors += shading_node.colors
@@ -882,7 +1486,7 @@ class MMsShadingNode():
 
                     # else if it's a Maya texture node
                     elif color_connection.connected_node_type == 'file':
-                        texture_node = MFile(self.params, color_connection.connected_node)
+                        texture_node = get_m_node(self.params, MFile, color_connection.connected_node)
                         self.attributes[attribute_key] = texture_node
                         self.textures += [texture_node]
 
@@ -895,6 +1499,249 @@ class MMsShadingNode():
                 self.attributes[attribute_key] = str(cmds.getAttr(maya_attribute))
 
 
+#--------------------------------------------------------------------------------------------------
+# AsEntityList class.
+#--------------------------------------------------------------------------------------------------
+
+class AsEntityList():
+
+    """ Ordered collection of named appleseed entities with constant time lookup by name """
+
+    def __init__(self, entity_type):
+        self.entity_type = entity_type
+        self.entities = []
+        self.entities_by_name = dict()
+
+        # set by AsEntityRecorder while a frame invariant part of the scene is translated
+        self.recorder = None
+
+    def append(self, entity):
+        # appleseed requires entity names to be unique so only the first entity with a given name is kept
+        existing_entity = self.entities_by_name.get(entity.name)
+        if existing_entity is not None:
+            if existing_entity is not entity:
+                ms_commands.warning('Skipping duplicate {0} "{1}".'.format(self.entity_type, entity.name))
+            entity = existing_entity
+        else:
+            self.entities.append(entity)
+            self.entities_by_name[entity.name] = entity
+
+        if self.recorder is not None:
+            self.recorder.record(self, entity)
+        return entity
+
+    def get(self, name):
+        entity = self.entities_by_name.get(name)
+        if entity is not None and self.recorder is not None:
+            self.recorder.record(self, entity)
+        return entity
+
+    def remove(self, name):
+        entity = self.entities_by_name.pop(name)
+        self.entities.remove(entity)
+        return entity
+
+    def remove_all(self, names):
+        names = set(names)
+        self.entities = [entity for entity in self.entities if entity.name not in names]
+        for name in names:
+            self.entities_by_name.pop(name, None)
+
+    def __iter__(self):
+        return iter(self.entities)
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __getitem__(self, index):
+        return self.entities[index]
+
+
+#--------------------------------------------------------------------------------------------------
+# AsEntityRecorder class.
+#--------------------------------------------------------------------------------------------------
+
+class AsEntityRecorder():
+
+    """ Records the entities a translation step adds to, or finds in, the root and parent assemblies so they can be added again to the assemblies of another frame """
+
+    def __init__(self, root_assembly, parent_assembly):
+        self.entries = []
+        self.entity_lists = []
+        self.entity_list_keys = dict()
+
+        for key, assembly in (('parent', parent_assembly), ('root', root_assembly)):
+            for list_name in AsAssembly.entity_list_names:
+                entity_list = getattr(assembly, list_name)
+                entity_list.recorder = self
+                self.entity_lists.append(entity_list)
+                self.entity_list_keys[id(entity_list)] = (key, list_name)
+
+    def record(self, entity_list, entity):
+        self.entries.append(self.entity_list_keys[id(entity_list)] + (entity,))
+
+    def stop(self):
+        for entity_list in self.entity_lists:
+            entity_list.recorder = None
+        self.entity_lists = []
+        self.entity_list_keys = dict()
+
+    def replay(self, root_assembly, parent_assembly):
+        assemblies = {'root': root_assembly, 'parent': parent_assembly}
+        for key, list_name, entity in self.entries:
+            entity_list = getattr(assemblies[key], list_name)
+            if entity_list.get(entity.name) is None:
+                entity_list.append(entity)
+
+
+#--------------------------------------------------------------------------------------------------
+# AsMaterialDeduplicator class.
+#--------------------------------------------------------------------------------------------------
+
+class AsMaterialDeduplicator():
+
+    """ Collapses structurally identical material networks of a root assembly onto the first one translated """
+
+    # entity lists of the root assembly that shading parameters can refer to, in lookup order
+    referenced_list_names = ['bsdfs', 'edfs', 'surface_shaders', 'colors', 'texture_instances']
+
+    def __init__(self, root_assembly, value_cache=None):
+        self.root_assembly = root_assembly
+        self.signatures = dict()
+        self.materials_by_signature = dict()
+
+        # the formatted values of the entities seen on previous frames, frame invariant entities are the same objects on
+        # every frame, their references are looked up again as the entities they refer to by name may not be
+        self.value_cache = value_cache if value_cache is not None else dict()
+
+    def get_survivor(self, material):
+
+        """ returns the first material translated with the same network as material """
+
+        survivor = self.materials_by_signature.setdefault(self.get_signature(material), material)
+        if survivor is not material:
+            # looked up by name so the survivor is recorded while a frame invariant hierarchy is translated
+            survivor = self.root_assembly.materials.get(survivor.name)
+        return survivor
+
+    def get_signature(self, entity):
+        # signatures leave out entity names so that networks only differing by name compare equal
+        signature = self.signatures.get(id(entity))
+        if signature is None:
+            class_name = entity.__class__.__name__
+            values = self.get_values(entity)
+            if class_name in ['AsColor', 'AsTexture']:
+                signature = values
+            elif class_name == 'AsTextureInstance':
+                signature = (class_name, self.get_signature(entity.texture)) + values
+            else:
+                parameter_signatures = []
+                for parameter, value in zip(self.get_parameters(entity), values):
+                    referenced_entity = self.get_referenced_entity(parameter)
+                    if referenced_entity is not None:
+                        parameter_signatures.append((parameter.name, self.get_signature(referenced_entity)))
+                    else:
+                        parameter_signatures.append((parameter.name, value))
+                signature = (class_name, entity.model, tuple(parameter_signatures))
+            self.signatures[id(entity)] = signature
+        return signature
+
+    def get_values(self, entity):
+        # the entity is kept with its values so that its id is not reused by another entity
+        cached_values = self.value_cache.get(id(entity))
+        if cached_values is not None and cached_values[0] is entity:
+            return cached_values[1]
+
+        class_name = entity.__class__.__name__
+        if class_name == 'AsColor':
+            values = (class_name, '%.6f %.6f %.6f' % tuple(entity.RGB_color[:3]), '%.6f' % entity.alpha, str(entity.multiplier.value), str(entity.color_space.value))
+        elif class_name == 'AsTextureInstance':
+            values = (str(entity.addressing_mode.value), str(entity.filtering_mode.value), str(entity.alpha_mode.value))
+        elif class_name == 'AsTexture':
+            values = (class_name, entity.model, str(entity.color_space.value), str(entity.file_name.as_normalized_path().value))
+        else:
+            values = tuple([str(parameter.value) for parameter in self.get_parameters(entity)])
+
+        self.value_cache[id(entity)] = (entity, values)
+        return values
+
+    def get_parameters(self, entity):
+        return get_shading_parameters(entity)
+
+    def get_referenced_entity(self, parameter):
+        for list_name in AsMaterialDeduplicator.referenced_list_names:
+            entity = getattr(self.root_assembly, list_name).get(str(parameter.value))
+            if entity is not None:
+                return entity
+        return None
+
+    def collect_references(self, entity, references):
+        references.add(id(entity))
+        if entity.__class__.__name__ == 'AsTextureInstance':
+            references.add(id(entity.texture))
+        for parameter in self.get_parameters(entity):
+            referenced_entity = self.get_referenced_entity(parameter)
+            if referenced_entity is not None and id(referenced_entity) not in references:
+                self.collect_references(referenced_entity, references)
+
+    def remove_duplicates(self):
+
+        """ removes the duplicate materials left unassigned, and the entities only they referred to, returns the number of materials removed """
+
+        assigned_material_names = set()
+        assemblies = [self.root_assembly]
+        while assemblies:
+            assembly = assemblies.pop()
+            assemblies.extend(assembly.assemblies)
+            for object_instance in assembly.object_instances:
+                for material_assignment in object_instance.material_assignments:
+                    assigned_material_names.add(material_assignment.material)
+
+        # materials added back by frame invariant hierarchies were not seen by get_survivor() on this frame
+        for material in self.root_assembly.materials:
+            if material.name in assigned_material_names:
+                self.materials_by_signature.setdefault(self.get_signature(material), material)
+
+        duplicate_materials = []
+        for material in self.root_assembly.materials:
+            survivor = self.materials_by_signature.get(self.get_signature(material))
+            if survivor is not None and survivor is not material and material.name not in assigned_material_names:
+                duplicate_materials.append(material)
+
+        if not duplicate_materials:
+            return 0
+
+        removed_references = set()
+        for material in duplicate_materials:
+            self.root_assembly.materials.remove(material.name)
+            self.collect_references(material, removed_references)
+
+        kept_references = set()
+        for entity in list(self.root_assembly.materials) + list(self.root_assembly.lights):
+            self.collect_references(entity, kept_references)
+
+        for list_name in AsMaterialDeduplicator.referenced_list_names + ['textures']:
+            entity_list = getattr(self.root_assembly, list_name)
+            for entity in list(entity_list):
+                if id(entity) in removed_references and id(entity) not in kept_references:
+                    entity_list.remove(entity.name)
+
+        return len(duplicate_materials)
+
+
+def get_shading_parameters(entity):
+
+    """ returns the parameters of a shading entity or light, which can refer to other entities by name """
+
+    if entity.__class__.__name__ == 'AsMaterial':
+        parameters = [entity.bsdf, entity.edf, entity.surface_shader, entity.alpha_map, entity.displacement_map,
+                      entity.displacement_mode, entity.bump_amplitude, entity.normal_map_up]
+        return [parameter for parameter in parameters if parameter is not None]
+    if entity.__class__.__name__ == 'AsLight':
+        return [entity.exitance]
+    return getattr(entity, 'parameters', [])
+
+
 #--------------------------------------------------------------------------------------------------
 # AsParameter class.
 #--------------------------------------------------------------------------------------------------
@@ -963,11 +1810,11 @@ class AsColor():
         self.multiplier.emit_xml(doc)
 
         doc.start_element('values')
-        doc.append_line('%.6f %.6f %.6f' % (self.RGB_color[0], self.RGB_color[1], self.RGB_color[2]))
+        doc.append_line(ms_format.format_floats(self.RGB_color[:3], 6))
         doc.end_element('values')
 
         doc.start_element('alpha')
-        doc.append_line('%.6f' % self.alpha)
+        doc.append_line(ms_format.format_floats([self.alpha], 6))
         doc.end_element('alpha')
 
         doc.end_element('color')
@@ -993,12 +1840,7 @@ class AsTransform():
             doc.append_element('scaling value="%s"' % self.scaling_value)
 
         for matrix in reversed(self.matrices):
-            doc.start_element('matrix')
-            doc.append_line('%.15f %.15f %.15f %.15f' % (matrix[0], matrix[4], matrix[8],  matrix[12]))
-            doc.append_line('%.15f %.15f %.15f %.15f' % (matrix[1], matrix[5], matrix[9],  matrix[13]))
-            doc.append_line('%.15f %.15f %.15f %.15f' % (matrix[2], matrix[6], matrix[10], matrix[14]))
-            doc.append_line('%.15f %.15f %.15f %.15f' % (matrix[3], matrix[7], matrix[11], matrix[15]))
-            doc.end_element('matrix')
+            doc.append_matrix(matrix)
 
         doc.end_element('transform')
 
@@ -1111,6 +1953,9 @@ class AsObjectInstance():
         self.transforms = []
         self.material_assignments = []
 
+        # world space bounds, only set for the static instances of the root assembly
+        self.bounding_box = None
+
     def emit_xml(self, doc):
         doc.start_element('object_instance name="%s" object="%s.0"' % (self.name, self.object.name))
         for transform in self.transforms:
@@ -1368,20 +2213,23 @@ class AsAssembly():
 
     """ Class representing appleseed Assembly entity """
 
+    entity_list_names = ['colors', 'textures', 'texture_instances', 'materials', 'bsdfs', 'edfs', 'surface_shaders',
+                         'lights', 'objects', 'object_instances', 'assemblies', 'assembly_instances']
+
     def __init__(self):
         self.name = None
-        self.colors = []
-        self.textures = []
-        self.texture_instances = []
-        self.materials = []
-        self.bsdfs = []
-        self.edfs = []
-        self.surface_shaders = []
-        self.lights = []
-        self.objects = []
-        self.object_instances = []
-        self.assemblies = []
-        self.assembly_instances = []
+        self.colors = AsEntityList('color')
+        self.textures = AsEntityList('texture')
+        self.texture_instances = AsEntityList('texture instance')
+        self.materials = AsEntityList('material')
+        self.bsdfs = AsEntityList('BSDF')
+        self.edfs = AsEntityList('EDF')
+        self.surface_shaders = AsEntityList('surface shader')
+        self.lights = AsEntityList('light')
+        self.objects = AsEntityList('object')
+        self.object_instances = AsEntityList('object instance')
+        self.assemblies = AsEntityList('assembly')
+        self.assembly_instances = AsEntityList('assembly instance')
 
         self.instances = []
 
@@ -1452,6 +2300,43 @@ class AsAssemblyInstance():
         doc.end_element('assembly_instance')
 
 
+#--------------------------------------------------------------------------------------------------
+# AsArchiveAssembly class.
+#--------------------------------------------------------------------------------------------------
+
+class AsArchiveAssembly(AsAssembly):
+
+    """ Class representing an appleseed Assembly entity whose content is loaded from another project file """
+
+    def __init__(self, file_name):
+        AsAssembly.__init__(self)
+        self.file_name = AsParameter('filename', file_name)
+
+    def emit_xml(self, doc):
+        doc.start_element('assembly name="%s" model="archive_assembly"' % self.name)
+        self.file_name.as_normalized_path().emit_xml(doc)
+        doc.end_element('assembly')
+
+
+#--------------------------------------------------------------------------------------------------
+# AsArchive class.
+#--------------------------------------------------------------------------------------------------
+
+class AsArchive():
+
+    """ Class representing an appleseed project file that only holds the assembly loaded by archive assemblies """
+
+    def __init__(self, as_assembly):
+        self.assembly = as_assembly
+
+    def emit_xml(self, doc):
+        doc.start_element('project')
+        doc.start_element('scene')
+        self.assembly.emit_xml(doc)
+        doc.end_element('scene')
+        doc.end_element('project')
+
+
 #--------------------------------------------------------------------------------------------------
 # AsFrame class.
 #--------------------------------------------------------------------------------------------------
@@ -1542,16 +2427,16 @@ class AsScene():
 
     def __init__(self):
         self.cameras = None
-        self.colors = []
-        self.textures = []
-        self.texture_instances = []
-        self.environment_edfs = []
-        self.environment_shaders = []
+        self.colors = AsEntityList('color')
+        self.textures = AsEntityList('texture')
+        self.texture_instances = AsEntityList('texture instance')
+        self.environment_edfs = AsEntityList('environment EDF')
+        self.environment_shaders = AsEntityList('environment shader')
         self.environment = None
         self.output = None
         self.configurations = None
-        self.assemblies = []
-        self.assembly_instances = []
+        self.assemblies = AsEntityList('assembly')
+        self.assembly_instances = AsEntityList('assembly instance')
 
     def emit_xml(self, doc):
         doc.start_element('scene')
@@ -1612,26 +2497,6 @@ class AsProject():
         doc.end_element('project')
 
 
-#--------------------------------------------------------------------------------------------------
-# fetch_m_camera function.
-#--------------------------------------------------------------------------------------------------
-
-def fetch_m_camera(m_transform, maya_camera_name):
-
-    # check if any direct children are the camera were looking for
-    for camera in m_transform.child_cameras:
-        if camera.name == maya_camera_name:
-            return camera
-
-    # if not found recursively check any child transform to see if they own the camera
-    for transform in m_transform.child_transforms:
-        camera = fetch_m_camera(transform, maya_camera_name)
-        if camera is not None:
-            return camera
-
-    return None
-
-
 #--------------------------------------------------------------------------------------------------
 # m_color_connection_to_as_color function.
 #--------------------------------------------------------------------------------------------------
@@ -1675,37 +2540,144 @@ def m_file_to_as_texture(params, m_file, postfix='', file_number=0):
     return as_texture, as_texture_instance
 
 
+#--------------------------------------------------------------------------------------------------
+# get_frame_list function.
+#--------------------------------------------------------------------------------------------------
+
+def get_frame_list(params):
+
+    """ returns the numbers of the frames to export """
+
+    # if animation export is on populate frame list with correct frame numbers
+    if params['export_animation']:
+        return range(params['animation_start_frame'], params['animation_end_frame'] + 1)
+
+    return [params['current_frame']]
+
+
 #--------------------------------------------------------------------------------------------------
 # traslate_maya_scene function.
 #--------------------------------------------------------------------------------------------------
 
-def translate_maya_scene(params, maya_scene, maya_environment):
+def translate_maya_scene(params, maya_scene, maya_environment, frame_list=None):
 
-    """ Main function for converting a cached Maya scene into an appleseed object hierarchy """
+    """ Main function for converting a cached Maya scene into an appleseed object hierarchy, by default all the exported frames are translated """
 
     # create dict for storing appleseed object models into
     # the key will be the file path to save the project too
     as_object_models = []
 
-    # initialize frame list with single default value
-    frame_list = [int(cmds.currentTime(query=True))]
+    # the static data is only shared when all the frames are translated together, a subset of the frames
+    # translated by a worker process would not know which entities the other frames share, the static data file
+    # is named after the frame file name with the frame number replaced, packaged projects hold all their data
+    share_static_data = params['share_static_data'] and frame_list is None and len(get_frame_list(params)) > 1 and '#' in params['file_name'] and not params['package_projects']
 
-    # compute the base output directory
-    scene_filepath = cmds.file(q=True, sceneName=True)
-    scene_basename = os.path.splitext(os.path.basename(scene_filepath))[0]
-    if len(scene_basename) == 0:
-        scene_basename = "Untitled"
-    project_directory = cmds.workspace(q=True, rd=True)
-    params['output_directory'] = params['output_directory'].replace("<ProjectDir>", project_directory)
+    if frame_list is None:
+        frame_list = get_frame_list(params)
+
+    # compute the base output directory, the scene name and project directory are stored by get_maya_scene()
+    scene_basename = params['scene_basename']
+    params['output_directory'] = params['output_directory'].replace("<ProjectDir>", params['project_directory'])
     params['output_directory'] = params['output_directory'].replace("<SceneName>", scene_basename)
 
     # compute the output file path
     base_file_name = params['file_name']
     base_file_name = params['file_name'].replace("<SceneName>", scene_basename)
 
-    # if animation export is on populate frame list with correct frame numbers
-    if params['export_animation']:
-        frame_list = range(params['animation_start_frame'], params['animation_end_frame'] + 1)
+    # the output, configurations and default material are the same for every frame so they are only created once
+
+    # create output and frame objects
+    as_output = AsOutput()
+    as_frame = AsFrame()
+    as_output.frames.append(as_frame)
+    # note: frame camera is set when the camera is retrieved for the scene element
+    as_frame.resolution = AsParameter('resolution', '%i %i' % (params['output_res_width'], params['output_res_height']))
+    as_frame.color_space.value = params['output_color_space']
+
+    if params['export_straight_alpha']:
+        as_frame.premultiplied_alpha.value = 'false'
+
+    # create configurations object
+    as_configurations = AsConfigurations()
+
+    # create interactive config
+    interactive_config = AsConfiguration()
+    as_configurations.configurations.append(interactive_config)
+    interactive_config.name = 'interactive'
+    interactive_config.base = 'base_interactive'
+
+    # create final config
+    final_config = AsConfiguration()
+    as_configurations.configurations.append(final_config)
+    final_config.name = 'final'
+    final_config.base = 'base_final'
+
+    if ['custom_final_config_check']:
+        final_config.parameters.append(AsParameter('lighting_engine', params['custom_final_config_engine']))
+
+        pt_parameters = AsParameters()
+        pt_parameters.name = 'pt'
+        pt_parameters.parameters.append(AsParameter('dl_light_samples',      params['pt_dl_light_samples']))
+        pt_parameters.parameters.append(AsParameter('enable_caustics',       params['pt_enable_caustics']))
+        pt_parameters.parameters.append(AsParameter('enable_dl',             params['pt_enable_dl']))
+        pt_parameters.parameters.append(AsParameter('enable_ibl',            params['pt_enable_ibl']))
+        pt_parameters.parameters.append(AsParameter('ibl_env_samples',       params['pt_ibl_env_samples']))
+        pt_parameters.parameters.append(AsParameter('ibl_bsdf_samples',      params['pt_ibl_bsdf_samples']))
+        pt_parameters.parameters.append(AsParameter('max_path_length',       params['pt_max_path_length']))
+        pt_parameters.parameters.append(AsParameter('next_event_estimation', params['pt_next_event_estimation']))
+        pt_parameters.parameters.append(AsParameter('rr_min_path_length',    params['pt_rr_min_path_length']))
+        final_config.parameters.append(pt_parameters)
+
+        drt_parameters = AsParameters()
+        drt_parameters.name = 'drt'
+        drt_parameters.parameters.append(AsParameter('dl_bsdf_samples',      params['drt_dl_bsdf_samples']))
+        drt_parameters.parameters.append(AsParameter('dl_light_samples',     params['drt_dl_light_samples']))
+        drt_parameters.parameters.append(AsParameter('enable_ibl',           params['drt_enable_ibl']))
+        drt_parameters.parameters.append(AsParameter('ibl_bsdf_samples',     params['drt_ibl_bsdf_samples']))
+        drt_parameters.parameters.append(AsParameter('ibl_env_samples',      params['drt_ibl_env_samples']))
+        drt_parameters.parameters.append(AsParameter('max_path_length',      params['drt_max_path_length']))
+        drt_parameters.parameters.append(AsParameter('rr_min_path_length',   params['drt_rr_min_path_length']))
+        final_config.parameters.append(drt_parameters)
+
+        generic_tile_renderer_parameters = AsParameters()
+        generic_tile_renderer_parameters.name = 'generic_tile_renderer'
+        generic_tile_renderer_parameters.parameters.append(AsParameter('filter_size',   params['gtr_filter_size']))
+        generic_tile_renderer_parameters.parameters.append(AsParameter('sampler',       params['gtr_sampler']))
+        generic_tile_renderer_parameters.parameters.append(AsParameter('min_samples',   params['gtr_min_samples']))
+        generic_tile_renderer_parameters.parameters.append(AsParameter('max_samples',   params['gtr_max_samples']))
+        generic_tile_renderer_parameters.parameters.append(AsParameter('max_contrast',  params['gtr_max_contrast']))
+        generic_tile_renderer_parameters.parameters.append(AsParameter('max_variation', params['gtr_max_variation']))
+        final_config.parameters.append(generic_tile_renderer_parameters)
+
+    # create default material
+    default_material = AsMaterial()
+    default_material.name = 'as_default_material'
+    default_material.alpha_map = AsParameter('alpha_map', '0')
+
+    default_surface_shader = AsSurfaceShader()
+    default_surface_shader.name = 'as_default_surface_shader'
+    default_surface_shader.model = 'constant_surface_shader'
+    default_surface_shader.parameters.append(AsParameter('color', '0'))
+    default_surface_shader.parameters.append(AsParameter('alpha_multiplier', '0'))
+
+    default_material.surface_shader = AsParameter('surface_shader', default_surface_shader.name)
+
+    # retrieve camera from Maya scene cache, the DAG path index is only built once for all frames
+    dag_path_index = index_maya_scene(maya_scene)
+    camera = dag_path_index.get(params['output_camera'])
+    if camera.__class__.__name__ != 'MCamera':
+        ms_commands.error('Camera not found: ' +  params['output_camera'])
+
+    # transforms whose whole hierarchy translates to the same entities on every frame are only translated once,
+    # the entities they add are recorded and added again to the assemblies of the following frames
+    translation_cache = None
+    if params['reuse_frame_invariant_entities'] and len(frame_list) > 1:
+        translation_cache = {'invariant_transforms': set(), 'recorders': dict()}
+        for transform in maya_scene:
+            find_frame_invariant_transforms(transform, translation_cache['invariant_transforms'])
+
+    # the formatted values of the material networks reused by the following frames are only computed once
+    material_value_cache = dict()
 
     for frame_number in frame_list:
         ms_commands.info("Exporting frame %i..." % frame_number)
@@ -1729,72 +2701,9 @@ def translate_maya_scene(params, maya_scene, maya_environment):
         # begin construction of as object hierarchy *************************************************
 
         as_project = AsProject()
-
-        # create output and frame objects
-        as_output = AsOutput()
         as_project.output = as_output
-        as_frame = AsFrame()
-        as_output.frames.append(as_frame)
-        # note: frame camera is set when the camera is retrieved for the scene element
-        as_frame.resolution = AsParameter('resolution', '%i %i' % (params['output_res_width'], params['output_res_height']))
-        as_frame.color_space.value = params['output_color_space']
-
-        if params['export_straight_alpha']:
-            as_frame.premultiplied_alpha.value = 'false'
-
-        # create configurations object
-        as_configurations = AsConfigurations()
         as_project.configurations = as_configurations
 
-        # create interactive config
-        interactive_config = AsConfiguration()
-        as_configurations.configurations.append(interactive_config)
-        interactive_config.name = 'interactive'
-        interactive_config.base = 'base_interactive'
-
-        # create final config
-        final_config = AsConfiguration()
-        as_configurations.configurations.append(final_config)
-        final_config.name = 'final'
-        final_config.base = 'base_final'
-
-        if ['custom_final_config_check']:
-            final_config.parameters.append(AsParameter('lighting_engine', params['custom_final_config_engine']))
-
-            pt_parameters = AsParameters()
-            pt_parameters.name = 'pt'
-            pt_parameters.parameters.append(AsParameter('dl_light_samples',      params['pt_dl_light_samples']))
-            pt_parameters.parameters.append(AsParameter('enable_caustics',       params['pt_enable_caustics']))
-            pt_parameters.parameters.append(AsParameter('enable_dl',             params['pt_enable_dl']))
-            pt_parameters.parameters.append(AsParameter('enable_ibl',            params['pt_enable_ibl']))
-            pt_parameters.parameters.append(AsParameter('ibl_env_samples',       params['pt_ibl_env_samples']))
-            pt_parameters.parameters.append(AsParameter('ibl_bsdf_samples',      params['pt_ibl_bsdf_samples']))
-            pt_parameters.parameters.append(AsParameter('max_path_length',       params['pt_max_path_length']))
-            pt_parameters.parameters.append(AsParameter('next_event_estimation', params['pt_next_event_estimation']))
-            pt_parameters.parameters.append(AsParameter('rr_min_path_length',    params['pt_rr_min_path_length']))
-            final_config.parameters.append(pt_parameters)
-
-            drt_parameters = AsParameters()
-            drt_parameters.name = 'drt'
-            drt_parameters.parameters.append(AsParameter('dl_bsdf_samples',      params['drt_dl_bsdf_samples']))
-            drt_parameters.parameters.append(AsParameter('dl_light_samples',     params['drt_dl_light_samples']))
-            drt_parameters.parameters.append(AsParameter('enable_ibl',           params['drt_enable_ibl']))
-            drt_parameters.parameters.append(AsParameter('ibl_bsdf_samples',     params['drt_ibl_bsdf_samples']))
-            drt_parameters.parameters.append(AsParameter('ibl_env_samples',      params['drt_ibl_env_samples']))
-            drt_parameters.parameters.append(AsParameter('max_path_length',      params['drt_max_path_length']))
-            drt_parameters.parameters.append(AsParameter('rr_min_path_length',   params['drt_rr_min_path_length']))
-            final_config.parameters.append(drt_parameters)
-
-            generic_tile_renderer_parameters = AsParameters()
-            generic_tile_renderer_parameters.name = 'generic_tile_renderer'
-            generic_tile_renderer_parameters.parameters.append(AsParameter('filter_size',   params['gtr_filter_size']))
-            generic_tile_renderer_parameters.parameters.append(AsParameter('sampler',       params['gtr_sampler']))
-            generic_tile_renderer_parameters.parameters.append(AsParameter('min_samples',   params['gtr_min_samples']))
-            generic_tile_renderer_parameters.parameters.append(AsParameter('max_samples',   params['gtr_max_samples']))
-            generic_tile_renderer_parameters.parameters.append(AsParameter('max_contrast',  params['gtr_max_contrast']))
-            generic_tile_renderer_parameters.parameters.append(AsParameter('max_variation', params['gtr_max_variation']))
-            final_config.parameters.append(generic_tile_renderer_parameters)
-
         # begin scene object
         as_project.scene = AsScene()
 
@@ -1844,22 +2753,13 @@ def translate_maya_scene(params, maya_scene, maya_environment):
             as_project.scene.environment = environment
             as_project.scene.environment_edfs.append(environment_edf)
 
-        # retrieve camera from Maya scene cache and create as camera
-        camera = None
-        for transform in maya_scene:
-            camera = fetch_m_camera(transform, params['output_camera'])
-            if camera is not None:
-                break
-        if camera == None:
-            ms_commands.error('Camera not found: ' +  params['output_camera'])
-
         # set camera parameter in as frame
         as_frame.camera = AsParameter('camera', camera.safe_name)
 
         # generic camera settings
         as_camera = AsCamera()
         as_camera.name = camera.safe_name
-        as_camera.film_dimensions = AsParameter('film_dimensions', '%f %f' % (camera.film_width, camera.film_height))
+        as_camera.film_dimensions = AsParameter('film_dimensions', '%f %f' % camera.get_film_dimensions(params['output_res_width'], params['output_res_height']))
         as_camera.focal_length = AsParameter('focal_length', camera.focal_length_values[non_mb_sample_number])
         as_camera.shutter_open_time.value = params['shutter_open_time']
         as_camera.shutter_close_time.value = params['shutter_close_time']
@@ -1900,24 +2800,31 @@ def translate_maya_scene(params, maya_scene, maya_environment):
         root_assembly_instance.transforms.append(AsTransform())
         as_project.scene.assembly_instances.append(root_assembly_instance)
 
-        # create default material
-        default_material = AsMaterial()
-        default_material.name = 'as_default_material'
-        default_material.alpha_map = AsParameter('alpha_map', '0')
-
-        default_surface_shader = AsSurfaceShader()
-        default_surface_shader.name = 'as_default_surface_shader'
-        default_surface_shader.model = 'constant_surface_shader'
-        default_surface_shader.parameters.append(AsParameter('color', '0'))
-        default_surface_shader.parameters.append(AsParameter('alpha_multiplier', '0'))
-
-        default_material.surface_shader = AsParameter('surface_shader', default_surface_shader.name)
-
         root_assembly.surface_shaders.append(default_surface_shader)
         root_assembly.materials.append(default_material)
 
+        material_deduplicator = None
+        if params['deduplicate_materials']:
+            material_deduplicator = AsMaterialDeduplicator(root_assembly, material_value_cache)
+
         for transform in maya_scene:
-            construct_transform_descendents(params, root_assembly, root_assembly, [], transform, mb_sample_number_list, non_mb_sample_number, params['export_camera_blur'], params['export_transformation_blur'], params['export_deformation_blur'])
+            construct_transform_descendents(params, root_assembly, root_assembly, [], transform, mb_sample_number_list, non_mb_sample_number, params['export_camera_blur'], params['export_transformation_blur'], params['export_deformation_blur'], translation_cache, material_deduplicator)
+
+        if material_deduplicator is not None:
+            duplicate_count = material_deduplicator.remove_duplicates()
+            if duplicate_count > 0:
+                ms_commands.info("Removed {0} duplicate materials.".format(duplicate_count))
+
+        if params['flatten_assemblies']:
+            hoisted_count = flatten_assemblies(root_assembly, params['collapse_matrix_stacks'])
+            if hoisted_count > 0:
+                ms_commands.info("Hoisted {0} nested assemblies into the root assembly.".format(hoisted_count))
+
+        # static object instances shared by every frame are partitioned once they have been moved to the static data
+        if params['partition_static_instances'] and not share_static_data:
+            partition_count = partition_static_object_instances(root_assembly, params['partition_size'])
+            if partition_count > 0:
+                ms_commands.info("Partitioned static object instances into {0} assemblies.".format(partition_count))
 
         # end construction of as project hierarchy ************************************************
 
@@ -1927,23 +2834,364 @@ def translate_maya_scene(params, maya_scene, maya_environment):
 
         as_object_models.append((project_file_path, as_project))
 
+    if share_static_data:
+        root_assemblies = [as_project.scene.assemblies.get('root_assembly') for project_file_path, as_project in as_object_models]
+        static_assembly = split_static_data(root_assemblies)
+        static_file_name = base_file_name.replace("#", 'static')
+
+        if static_assembly is not None:
+            ms_commands.info("Moved {0} entities shared by every frame to {1}.".format(sum([len(getattr(static_assembly, list_name)) for list_name in AsAssembly.entity_list_names]), static_file_name))
+
+        # static object instances are shared by every frame unless nothing could be shared
+        if params['partition_static_instances']:
+            for as_assembly in [static_assembly] if static_assembly is not None else root_assemblies:
+                partition_count = partition_static_object_instances(as_assembly, params['partition_size'])
+                if partition_count > 0:
+                    ms_commands.info("Partitioned static object instances into {0} assemblies.".format(partition_count))
+
+        if static_assembly is not None:
+            # every frame loads the static data through an archive assembly placed in its root assembly
+            archive_assembly = AsArchiveAssembly(static_file_name)
+            archive_assembly.name = static_assembly.name
+            archive_assembly_instance = archive_assembly.instantiate()
+            archive_assembly_instance.transforms.append(AsTransform())
+            for root_assembly in root_assemblies:
+                root_assembly.assemblies.append(archive_assembly)
+                root_assembly.assembly_instances.append(archive_assembly_instance)
+
+            as_object_models.insert(0, (os.path.join(params['output_directory'], static_file_name), AsArchive(static_assembly)))
+
     return as_object_models
 
 
+#--------------------------------------------------------------------------------------------------
+# find_frame_invariant_transforms function.
+#--------------------------------------------------------------------------------------------------
+
+def find_frame_invariant_transforms(m_transform, invariant_transforms, parent_is_static=True):
+
+    """ adds the topmost transforms whose hierarchy translates to the same entities on every frame to invariant_transforms, returns True if m_transform is one of them """
+
+    # decided from the cached samples as transforms can be animated without any connection, e.g. by IK solvers
+    is_static = parent_is_static and m_transform.matrices.samples_are_equal() and m_transform.visibility_states.samples_are_equal()
+
+    # the matrix stack of every descendent of a transform that moves or blinks changes between frames, none of
+    # them is invariant
+    if not is_static:
+        return False
+
+    # every child is visited as the children of a transform that is not invariant, e.g. because one of its meshes
+    # deforms or another child is animated, can still be invariant themselves
+    children_are_invariant = True
+    for transform in m_transform.child_transforms:
+        if not find_frame_invariant_transforms(transform, invariant_transforms, is_static):
+            children_are_invariant = False
+
+    if not children_are_invariant:
+        return False
+
+    for mesh in m_transform.child_meshes:
+        if mesh.has_deformation:
+            return False
+        for material in mesh.ms_materials + mesh.generic_materials:
+            for texture in material.textures:
+                if texture is not None and texture.is_animated:
+                    return False
+
+    for light in m_transform.child_lights:
+        if light.color.__class__.__name__ == 'MFile' and light.color.is_animated:
+            return False
+
+    # only keep the topmost invariant transform of a hierarchy
+    for transform in m_transform.child_transforms:
+        invariant_transforms.discard(transform)
+    invariant_transforms.add(m_transform)
+
+    return True
+
+
+#--------------------------------------------------------------------------------------------------
+# flatten_assemblies function.
+#--------------------------------------------------------------------------------------------------
+
+def flatten_assemblies(as_assembly, collapse_matrix_stacks=False):
+
+    """ moves the assemblies nested in the child assemblies of as_assembly into as_assembly so that they are all instanced
+        from it, removes the child assemblies left empty and returns the number of assemblies moved """
+
+    # assemblies are only created for transforms moving during the shutter, such transforms are never frame
+    # invariant so their assemblies belong to a single frame and are modified in place
+    hoisted_count = 0
+
+    for child_assembly in list(as_assembly.assemblies):
+        hoisted_count += flatten_assemblies(child_assembly, collapse_matrix_stacks)
+
+        if len(child_assembly.instances) != 1:
+            continue
+        child_instance = child_assembly.instances[0]
+        if as_assembly.assembly_instances.get(child_instance.name) is not child_instance:
+            continue
+
+        for nested_assembly in list(child_assembly.assemblies):
+            if len(nested_assembly.instances) != 1:
+                continue
+            nested_instance = nested_assembly.instances[0]
+            if child_assembly.assembly_instances.get(nested_instance.name) is not nested_instance:
+                continue
+
+            transforms = bake_assembly_instance_transforms(child_instance.transforms, nested_instance.transforms, collapse_matrix_stacks)
+            if transforms is None:
+                continue
+
+            child_assembly.assemblies.remove(nested_assembly.name)
+            child_assembly.assembly_instances.remove(nested_instance.name)
+            nested_instance.transforms = transforms
+            as_assembly.assemblies.append(nested_assembly)
+            as_assembly.assembly_instances.append(nested_instance)
+            hoisted_count += 1
+
+        if sum([len(getattr(child_assembly, list_name)) for list_name in AsAssembly.entity_list_names]) == 0:
+            as_assembly.assemblies.remove(child_assembly.name)
+            as_assembly.assembly_instances.remove(child_instance.name)
+
+    return hoisted_count
+
+def bake_assembly_instance_transforms(parent_transforms, transforms, collapse_matrix_stacks):
+
+    """ returns the transforms of an assembly instance moved out of the assembly instanced with parent_transforms, or None
+        if their motion samples are taken at different times """
+
+    if [transform.time for transform in parent_transforms] != [transform.time for transform in transforms]:
+        return None
+    if [transform.scaling_value for transform in parent_transforms + transforms] != [1.0] * (len(parent_transforms) + len(transforms)):
+        return None
+
+    # like the inherited matrix stack the parent matrices come first, the motions are combined sample by sample
+    # so between samples appleseed interpolates their product, as it does for collapsed matrix stacks
+    baked_transforms = []
+    for parent_transform, transform in zip(parent_transforms, transforms):
+        baked_transform = copy.copy(transform)
+        baked_transform.matrices = parent_transform.matrices + transform.matrices
+        if collapse_matrix_stacks and len(baked_transform.matrices) > 1:
+            baked_transform.matrices = [ms_commands.matrix_stack_multiply(baked_transform.matrices)]
+        baked_transforms.append(baked_transform)
+
+    return baked_transforms
+
+
+#--------------------------------------------------------------------------------------------------
+# partition_static_object_instances function.
+#--------------------------------------------------------------------------------------------------
+
+def partition_static_object_instances(root_assembly, partition_size):
+
+    """ moves the static object instances of the root assembly into child assemblies of at most partition_size spatially close instances, returns the number of assemblies created """
+
+    object_instances = [object_instance for object_instance in root_assembly.object_instances if object_instance.bounding_box is not None]
+    if len(object_instances) <= partition_size:
+        return 0
+
+    partitions = []
+    split_object_instances(object_instances, partition_size, partitions)
+
+    moved_object_instance_names = []
+    moved_objects = dict()
+    for partition_index, partition in enumerate(partitions):
+        partition_assembly = AsAssembly()
+        # the prefix holds a character legalize_name() replaces, so the name cannot be the one of a Maya transform
+        partition_assembly.name = 'mayaseed:static_partition_%i' % partition_index
+
+        for object_instance in partition:
+            partition_assembly.objects.append(object_instance.object)
+            partition_assembly.object_instances.append(object_instance)
+            moved_object_instance_names.append(object_instance.name)
+            moved_objects[object_instance.object.name] = object_instance.object
+
+        root_assembly.assemblies.append(partition_assembly)
+        partition_assembly_instance = partition_assembly.instantiate()
+        partition_assembly_instance.transforms.append(AsTransform())
+        root_assembly.assembly_instances.append(partition_assembly_instance)
+
+    root_assembly.object_instances.remove_all(moved_object_instance_names)
+
+    # objects that still have instances in the root assembly stay there as well
+    for object_instance in root_assembly.object_instances:
+        moved_objects.pop(object_instance.object.name, None)
+    root_assembly.objects.remove_all(moved_objects.keys())
+
+    return len(partitions)
+
+def split_object_instances(object_instances, partition_size, partitions):
+    if len(object_instances) <= partition_size:
+        partitions.append(object_instances)
+        return
+
+    # median split along the axis on which the bounding box centers are the most spread out
+    centers = dict()
+    for object_instance in object_instances:
+        bounding_box = object_instance.bounding_box
+        centers[id(object_instance)] = [(bounding_box[i] + bounding_box[i + 3]) * 0.5 for i in range(3)]
+
+    extents = []
+    for axis in range(3):
+        axis_centers = [center[axis] for center in centers.values()]
+        extents.append(max(axis_centers) - min(axis_centers))
+    split_axis = extents.index(max(extents))
+
+    object_instances = sorted(object_instances, key=lambda object_instance: centers[id(object_instance)][split_axis])
+    middle = len(object_instances) // 2
+    split_object_instances(object_instances[:middle], partition_size, partitions)
+    split_object_instances(object_instances[middle:], partition_size, partitions)
+
+def transform_is_static(m_transform):
+    while m_transform is not None:
+        if m_transform.is_animated:
+            return False
+        m_transform = m_transform.parent
+    return True
+
+
+#--------------------------------------------------------------------------------------------------
+# split_static_data function.
+#--------------------------------------------------------------------------------------------------
+
+def split_static_data(root_assemblies):
+
+    """ moves the entities found in every root assembly into a new static data assembly, returns it or None if there are none """
+
+    # frame invariant entities are the same objects in each root assembly, the entities translated again
+    # on every frame are shared when they are written the same way on every frame
+    first_root_assembly = root_assemblies[0]
+    entity_xml = dict()
+    shared_entities = []
+    for list_name in AsAssembly.entity_list_names:
+        for entity in getattr(first_root_assembly, list_name):
+            is_shared = True
+            for root_assembly in root_assemblies[1:]:
+                other_entity = getattr(root_assembly, list_name).get(entity.name)
+                if other_entity is not entity and (other_entity is None or get_entity_xml(other_entity, entity_xml) != get_entity_xml(entity, entity_xml)):
+                    is_shared = False
+                    break
+            if is_shared:
+                shared_entities.append((list_name, entity))
+
+    shared_keys = set([(list_name, entity.name) for list_name, entity in shared_entities])
+
+    # the static data assembly is instanced in the root assemblies so its entities can refer to the entities of the root
+    # assemblies but cannot be seen from there, shared entities referred to by the entities that stay in a root assembly stay as well
+    kept_names = set()
+    for root_assembly in root_assemblies:
+        for list_name in AsAssembly.entity_list_names:
+            for entity in getattr(root_assembly, list_name):
+                if (list_name, entity.name) not in shared_keys:
+                    collect_referenced_names(entity, kept_names)
+
+    # the entities kept that way keep what they refer to as well, and texture instances stay with their texture
+    removed = True
+    while removed:
+        removed = False
+        for list_name, entity in shared_entities:
+            if (list_name, entity.name) not in shared_keys:
+                continue
+            if entity.name in kept_names or (list_name == 'texture_instances' and ('textures', entity.texture.name) not in shared_keys):
+                shared_keys.discard((list_name, entity.name))
+                collect_referenced_names(entity, kept_names)
+                removed = True
+
+    if not shared_keys:
+        return None
+
+    # the entities of the first frame stand for their copies in the other frames
+    static_assembly = AsAssembly()
+    # like partition assemblies the name cannot be the one of a Maya transform
+    static_assembly.name = 'mayaseed:static_data'
+    for list_name, entity in shared_entities:
+        if (list_name, entity.name) in shared_keys:
+            getattr(static_assembly, list_name).append(entity)
+
+    for root_assembly in root_assemblies:
+        for list_name in AsAssembly.entity_list_names:
+            getattr(root_assembly, list_name).remove_all([name for key, name in shared_keys if key == list_name])
+
+    return static_assembly
+
+def get_entity_xml(entity, entity_xml):
+    xml = entity_xml.get(id(entity))
+    if xml is None:
+        doc = WriteXml(None, cStringIO.StringIO())
+        entity.emit_xml(doc)
+        doc.flush()
+        xml = doc.file_object.getvalue()
+        entity_xml[id(entity)] = xml
+    return xml
+
+def collect_referenced_names(entity, names):
+
+    """ adds the names of the entities entity may refer to to names, values that are not entity names are added as well """
+
+    class_name = entity.__class__.__name__
+    if class_name == 'AsTextureInstance':
+        names.add(entity.texture.name)
+    elif class_name == 'AsObjectInstance':
+        names.add(entity.object.name)
+        for material_assignment in entity.material_assignments:
+            names.add(material_assignment.material)
+    elif class_name == 'AsAssemblyInstance':
+        names.add(entity.assembly.name)
+    elif isinstance(entity, AsAssembly):
+        # the entities of a child assembly can refer to the entities of their parent assemblies
+        for list_name in AsAssembly.entity_list_names:
+            for child_entity in getattr(entity, list_name):
+                collect_referenced_names(child_entity, names)
+    else:
+        for parameter in get_shading_parameters(entity):
+            if parameter.__class__.__name__ == 'AsParameter':
+                names.add(str(parameter.value))
+
+
 #--------------------------------------------------------------------------------------------------
 # construct_transform_descendents function.
 #--------------------------------------------------------------------------------------------------
 
-def construct_transform_descendents(params, root_assembly, parent_assembly, matrix_stack, maya_transform, mb_sample_number_list, non_mb_sample_number, camera_blur, transformation_blur, object_blur):
+def construct_transform_descendents(params, root_assembly, parent_assembly, matrix_stack, maya_transform, mb_sample_number_list, non_mb_sample_number, camera_blur, transformation_blur, object_blur, translation_cache=None, material_deduplicator=None):
 
     """ this function recursively builds an appleseed object hierarchy from a Maya scene """
 
+    # frame invariant hierarchies are translated on the first frame and their entities reused on the following ones
+    if translation_cache is not None and maya_transform in translation_cache['invariant_transforms']:
+        recorder = translation_cache['recorders'].get(maya_transform)
+        if recorder is not None:
+            recorder.replay(root_assembly, parent_assembly)
+        else:
+            recorder = AsEntityRecorder(root_assembly, parent_assembly)
+            construct_transform_descendents(params, root_assembly, parent_assembly, matrix_stack, maya_transform, mb_sample_number_list, non_mb_sample_number, camera_blur, transformation_blur, object_blur, None, material_deduplicator)
+            recorder.stop()
+            translation_cache['recorders'][maya_transform] = recorder
+        return
+
     current_assembly = parent_assembly
-    current_matrix_stack = matrix_stack + [maya_transform.matrices[non_mb_sample_number]]
+
+    # animated transforms that hold still during the shutter of this frame are translated like static ones
+    has_transformation_blur = False
+    if maya_transform.is_animated and transformation_blur:
+        first_matrix = maya_transform.matrices[mb_sample_number_list[0]]
+        for sample_number in mb_sample_number_list[1:]:
+            if maya_transform.matrices[sample_number] != first_matrix:
+                has_transformation_blur = True
+                break
+
+    if maya_transform.is_animated and transformation_blur and not has_transformation_blur:
+        current_matrix_stack = matrix_stack + [maya_transform.matrices[mb_sample_number_list[0]]]
+    else:
+        current_matrix_stack = matrix_stack + [maya_transform.matrices[non_mb_sample_number]]
+
+    # when collapsing matrix stacks the stack holds at most one matrix, the product of the whole stack
+    if params['collapse_matrix_stacks'] and len(current_matrix_stack) > 1:
+        current_matrix_stack = [ms_commands.matrix_stack_multiply(current_matrix_stack)]
 
     if maya_transform.has_children and maya_transform.visibility_states[non_mb_sample_number]:
 
-        if maya_transform.is_animated and transformation_blur:
+        if has_transformation_blur:
             current_assembly = AsAssembly()
             current_assembly.name = maya_transform.safe_name
             parent_assembly.assemblies.append(current_assembly)
@@ -1951,18 +3199,32 @@ def construct_transform_descendents(params, root_assembly, parent_assembly, matr
             parent_assembly.assembly_instances.append(current_assembly_instance)
             current_matrix_stack = []
 
-            sample_index = 0
+            instance_matrices = [maya_transform.matrices[sample_number] for sample_number in mb_sample_number_list]
+            if params['collapse_matrix_stacks'] and len(matrix_stack) > 0:
+                instance_matrices = ms_commands.matrices_multiply(instance_matrices, matrix_stack)
+
+            # samples are still timed by their position in the full sample list when some are dropped
+            sample_indices = range(len(instance_matrices))
+            if params['adaptive_motion_samples']:
+                # appleseed interpolates the product of the matrices of each sample
+                sampled_matrices = instance_matrices
+                if not params['collapse_matrix_stacks'] and len(matrix_stack) > 0:
+                    sampled_matrices = ms_commands.matrices_multiply(instance_matrices, [ms_commands.matrix_stack_multiply(matrix_stack)])
+                sample_indices = ms_commands.matrices_adaptive_sample_indices(sampled_matrices, params['motion_sample_tolerance'])
+
             sample_count = len(mb_sample_number_list)
             time_increment = 1.0 / (sample_count - 1) if sample_count > 1 else 1.0
-            for sample_number in mb_sample_number_list:
+            for sample_index in sample_indices:
                 new_transform = AsTransform()
                 new_transform.time = sample_index * time_increment
-                new_transform.matrices = [maya_transform.matrices[sample_number]] + matrix_stack
+                if params['collapse_matrix_stacks']:
+                    new_transform.matrices = [instance_matrices[sample_index]]
+                else:
+                    new_transform.matrices = matrix_stack + [instance_matrices[sample_index]]
                 current_assembly_instance.transforms.append(new_transform)
-                sample_index += 1
 
         for transform in maya_transform.child_transforms:
-            construct_transform_descendents(params, root_assembly, current_assembly, current_matrix_stack, transform, mb_sample_number_list, non_mb_sample_number, camera_blur, transformation_blur, object_blur)
+            construct_transform_descendents(params, root_assembly, current_assembly, current_matrix_stack, transform, mb_sample_number_list, non_mb_sample_number, camera_blur, transformation_blur, object_blur, translation_cache, material_deduplicator)
 
         for light in maya_transform.child_lights:
 
@@ -2005,13 +3267,22 @@ def construct_transform_descendents(params, root_assembly, parent_assembly, matr
             if not object_blur or not new_mesh.has_deformation:
                 # If the mesh has no deformation there will only be one sample so always take the first sample.
                 if new_mesh.has_deformation:
-                    new_mesh.file_names = AsParameter('filename', mesh.mesh_file_names[non_mb_sample_number])
+                    mesh_file_names = [mesh.mesh_file_names[non_mb_sample_number]]
                 else:
-                    new_mesh.file_names = AsParameter('filename', mesh.mesh_file_names[0])
+                    mesh_file_names = [mesh.mesh_file_names[0]]
+            else:
+                mesh_file_names = [mesh.mesh_file_names[i] for i in mb_sample_number_list]
+
+            # no geometry is exported for the samples where the mesh is hidden
+            if None in mesh_file_names:
+                continue
+
+            if not object_blur or not new_mesh.has_deformation:
+                new_mesh.file_names = AsParameter('filename', mesh_file_names[0])
             else:
                 file_names = AsParameters('filename')
-                for i in mb_sample_number_list:
-                    file_names.parameters.append(AsParameter(i - mb_sample_number_list[0], mesh.mesh_file_names[i]))
+                for i, mesh_file_name in zip(mb_sample_number_list, mesh_file_names):
+                    file_names.parameters.append(AsParameter(i - mb_sample_number_list[0], mesh_file_name))
                 new_mesh.file_names = file_names
 
             current_assembly.objects.append(new_mesh)
@@ -2021,12 +3292,18 @@ def construct_transform_descendents(params, root_assembly, parent_assembly, matr
                 mesh_transform.matrices = current_matrix_stack
             mesh_instance.transforms.append(mesh_transform)
 
+            if params['partition_static_instances'] and current_assembly is root_assembly and mesh.bounding_box is not None and transform_is_static(maya_transform):
+                mesh_instance.bounding_box = ms_commands.bounding_box_transform(mesh.bounding_box, ms_commands.matrix_stack_multiply(current_matrix_stack))
+
             # translate materials and assign
             for maya_ms_material in mesh.ms_materials:
                 as_materials = convert_maya_ms_material_network(params, root_assembly, maya_ms_material, non_mb_sample_number)
 
                 if as_materials is not None:
-                    
+
+                    if material_deduplicator is not None:
+                        as_materials = [material_deduplicator.get_survivor(m) if m is not None else None for m in as_materials]
+
                     if as_materials[0] is not None:
                         mesh_instance.material_assignments.append(AsObjectInstanceMaterialAssignment(maya_ms_material.name, 'front', as_materials[0].name))
                     else:
@@ -2040,6 +3317,8 @@ def construct_transform_descendents(params, root_assembly, parent_assembly, matr
             for maya_generic_material in mesh.generic_materials:
 
                 as_material = convert_maya_generic_material(params, root_assembly, maya_generic_material, non_mb_sample_number)
+                if material_deduplicator is not None:
+                    as_material = material_deduplicator.get_survivor(as_material)
 
                 mesh_instance.material_assignments.append(AsObjectInstanceMaterialAssignment(maya_generic_material.name, 'front', as_material.name))
                 mesh_instance.material_assignments.append(AsObjectInstanceMaterialAssignment(maya_generic_material.name, 'back', as_material.name))
@@ -2054,7 +3333,7 @@ def construct_transform_descendents(params, root_assembly, parent_assembly, matr
 def convert_maya_generic_material(params, root_assembly, generic_material, non_mb_sample_number):
 
     # check if material already exits in the root assembly
-    new_material = get_from_list(root_assembly.materials, generic_material.safe_name)
+    new_material = root_assembly.materials.get(generic_material.safe_name)
     if new_material is not None:
         return new_material
 
@@ -2127,11 +3406,10 @@ def convert_maya_ms_material_network(params, root_assembly, ms_material, non_mb_
     materials = [None, None]
 
     # check if material already exists in root_assembly
-    for material in root_assembly.materials:
-        if material.name == (ms_material.safe_name + '_front') and ms_material.enable_front:
-            materials[0] = material
-        if material.name == (ms_material.safe_name + '_back') and ms_material.enable_back and ms_material.duplicate_shaders:
-            materials[1] = material
+    if ms_material.enable_front:
+        materials[0] = root_assembly.materials.get(ms_material.safe_name + '_front')
+    if ms_material.enable_back and ms_material.duplicate_shaders:
+        materials[1] = root_assembly.materials.get(ms_material.safe_name + '_back')
 
     if materials[0] is None and materials[1] is None:
         if ms_material.alpha_map is not None:
@@ -2169,8 +3447,8 @@ def convert_maya_ms_material_network(params, root_assembly, ms_material, non_mb_
             if ms_material.displacement_map_front is not None:
 
                 texture, texture_instance = m_file_to_as_texture(params, ms_material.displacement_map_front, '_displacement_back', non_mb_sample_number)
-                existing_texture = get_from_list(root_assembly.textures, texture.name)
-                existing_texture_instance = get_from_list(root_assembly.texture_instances, texture_instance.name)
+                existing_texture = root_assembly.textures.get(texture.name)
+                existing_texture_instance = root_assembly.texture_instances.get(texture_instance.name)
 
                 if existing_texture is None:
                     root_assembly.textures.append(texture)
@@ -2206,8 +3484,8 @@ def convert_maya_ms_material_network(params, root_assembly, ms_material, non_mb_
             if ms_material.displacement_map_back is not None:
 
                 texture, texture_instance = m_file_to_as_texture(params, ms_material.displacement_map_back, '_displacement_back', non_mb_sample_number)
-                existing_texture = get_from_list(root_assembly.textures, texture.name)
-                existing_texture_instance = get_from_list(root_assembly.texture_instances, texture_instance.name)
+                existing_texture = root_assembly.textures.get(texture.name)
+                existing_texture_instance = root_assembly.texture_instances.get(texture_instance.name)
 
                 if existing_texture is None:
                     root_assembly.textures.append(texture)
@@ -2232,21 +3510,6 @@ def convert_maya_ms_material_network(params, root_assembly, ms_material, non_mb_
     return materials
 
 
-#--------------------------------------------------------------------------------------------------
-# get_from_list function.
-#--------------------------------------------------------------------------------------------------
-
-def get_from_list(list, name):
-
-    """ searches through list of objects with a .name attribute or surface_shaders and returns the object if it exists or None if not """
-
-    for item in list:
-        if item.name == name:
-            return item
-
-    return None
-
-
 #--------------------------------------------------------------------------------------------------
 # build_as_shading_nodes function.
 #--------------------------------------------------------------------------------------------------
@@ -2258,41 +3521,43 @@ def build_as_shading_nodes(params, root_assembly, current_maya_shading_node, non
     # the connection is an edf, bsdf or surface_shader
     current_shading_node = None
     if current_maya_shading_node.type == 'bsdf':
-        current_shading_node = get_from_list(root_assembly.bsdfs, current_maya_shading_node.safe_name)
+        current_shading_node = root_assembly.bsdfs.get(current_maya_shading_node.safe_name)
         if current_shading_node is None:
             current_shading_node = AsBsdf()
+            current_shading_node.name = current_maya_shading_node.safe_name
             root_assembly.bsdfs.append(current_shading_node)
         else:
             return current_shading_node
 
     elif current_maya_shading_node.type == 'edf':
-        current_shading_node = get_from_list(root_assembly.edfs, current_maya_shading_node.safe_name)
+        current_shading_node = root_assembly.edfs.get(current_maya_shading_node.safe_name)
         if current_shading_node is None:
             current_shading_node = AsEdf()
+            current_shading_node.name = current_maya_shading_node.safe_name
             root_assembly.edfs.append(current_shading_node)
         else:
             return current_shading_node
 
     elif current_maya_shading_node.type == 'surface_shader':
-        current_shading_node = get_from_list(root_assembly.surface_shaders, current_maya_shading_node.safe_name)
+        current_shading_node = root_assembly.surface_shaders.get(current_maya_shading_node.safe_name)
         if current_shading_node is None:
             current_shading_node = AsSurfaceShader()
+            current_shading_node.name = current_maya_shading_node.safe_name
             root_assembly.surface_shaders.append(current_shading_node)
         else:
             return current_shading_node
 
-    current_shading_node.name = current_maya_shading_node.safe_name
     current_shading_node.model = current_maya_shading_node.model
 
     for attrib_key in current_maya_shading_node.attributes:
         if current_maya_shading_node.attributes[attrib_key].__class__.__name__ == 'MMsShadingNode':
-            new_shading_node = get_from_list(root_assembly.edfs, current_maya_shading_node.attributes[attrib_key].safe_name)
+            new_shading_node = root_assembly.edfs.get(current_maya_shading_node.attributes[attrib_key].safe_name)
 
             if new_shading_node is None:
-                new_shading_node = get_from_list(root_assembly.bsdfs, current_maya_shading_node.attributes[attrib_key].safe_name)
+                new_shading_node = root_assembly.bsdfs.get(current_maya_shading_node.attributes[attrib_key].safe_name)
 
             if new_shading_node is None:
-                new_shading_node = get_from_list(root_assembly.surface_shaders, current_maya_shading_node.attributes[attrib_key].safe_name)
+                new_shading_node = root_assembly.surface_shaders.get(current_maya_shading_node.attributes[attrib_key].safe_name)
 
             if new_shading_node is None:
                 new_shading_node = build_as_shading_nodes(params, root_assembly, current_maya_shading_node.attributes[attrib_key], non_mb_sample_number)
@@ -2301,7 +3566,7 @@ def build_as_shading_nodes(params, root_assembly, current_maya_shading_node, non
             current_shading_node.parameters.append(new_shading_node_parameter)
 
         elif current_maya_shading_node.attributes[attrib_key].__class__.__name__ == 'MFile':
-            texture_entity = get_from_list(root_assembly.textures, current_maya_shading_node.attributes[attrib_key].safe_name)
+            texture_entity = root_assembly.textures.get(current_maya_shading_node.attributes[attrib_key].safe_name)
 
             if texture_entity is None:
                 texture_entity, texture_instance = m_file_to_as_texture(params, current_maya_shading_node.attributes[attrib_key], '', non_mb_sample_number)
@@ -2316,7 +3581,7 @@ def build_as_shading_nodes(params, root_assembly, current_maya_shading_node, non
             current_shading_node.parameters.append(new_shading_node_parameter)
 
         elif current_maya_shading_node.attributes[attrib_key].__class__.__name__ == 'MColorConnection':
-            new_color_entity = get_from_list(root_assembly.colors, current_maya_shading_node.attributes[attrib_key].safe_name)
+            new_color_entity = root_assembly.colors.get(current_maya_shading_node.attributes[attrib_key].safe_name)
 
             if new_color_entity is None:
                 new_color_entity = AsColor()
@@ -2348,23 +3613,55 @@ def export_container(render_settings_node):
     export_start_time = time.time()
 
     params = get_maya_params(render_settings_node)
+
+    # an export session reuses the data of the previous export for the nodes that were not edited since
+    session = None
+    if params['reuse_unedited_nodes']:
+        session = ms_export_session.get_session(render_settings_node)
+        session.begin_export(params)
+    else:
+        ms_export_session.end_session(render_settings_node)
+
     maya_scene, maya_environment = get_maya_scene(params)
+
+    # worker processes read the cached scene from a scene cache
+    translate_in_processes = params['parallel_translation'] and len(get_frame_list(params)) > 1
+
+    # the static data shared by the frames is found by translating all of them in a single process
+    if translate_in_processes and params['share_static_data']:
+        ms_commands.warning("Static data is shared between frames, translating the frames in a single process.")
+        translate_in_processes = False
+
+    if params['write_scene_cache'] or translate_in_processes:
+        write_scene_cache(get_scene_cache_path(params), params, maya_scene, maya_environment)
+
     scene_cache_finish_time = time.time()
 
     ms_commands.info('Scene cached for translation in %.2f seconds.' % (scene_cache_finish_time - export_start_time))
 
-    as_object_models = translate_maya_scene(params, maya_scene, maya_environment)
-    scene_translation_finish_time = time.time()
+    if translate_in_processes:
+        # the scene cache only written for the worker processes is removed even if some of them failed
+        try:
+            translate_scene_cache_in_processes(get_scene_cache_path(params), get_frame_list(params))
+        finally:
+            if not params['write_scene_cache']:
+                os.remove(get_scene_cache_path(params))
+
+        ms_commands.info('Scene translated and saved in %.2f seconds.' % (time.time() - scene_cache_finish_time))
+    else:
+        as_object_models = translate_maya_scene(params, maya_scene, maya_environment)
+        scene_translation_finish_time = time.time()
+
+        ms_commands.info('Scene translated in %.2f seconds.' % (scene_translation_finish_time - scene_cache_finish_time))
 
-    ms_commands.info('Scene translated in %.2f seconds.' % (scene_translation_finish_time - scene_cache_finish_time))
+        save_as_object_models(as_object_models, params.get('file_manifest'), params.get('packaged_files'))
 
-    for as_object in as_object_models:
-        ms_commands.info('Saving %s...' % as_object[0])
-        doc = WriteXml(as_object[0])
-        doc.append_line('<?xml version="1.0" encoding="UTF-8"?>')
-        doc.append_line('<!-- File generated by Mayaseed version {0} -->'.format(ms_commands.MAYASEED_VERSION))
-        as_object[1].emit_xml(doc)
-        doc.close()
+    if 'file_manifest' in params:
+        params['file_manifest'].save()
+
+    if session is not None:
+        m_node_cache, geometry_files = get_export_session_data(params, maya_scene)
+        session.end_export(m_node_cache, geometry_files)
 
     export_finish_time = time.time()
 
@@ -2374,6 +3671,240 @@ def export_container(render_settings_node):
     cmds.confirmDialog(message=completed_message, button='ok')
 
 
+#--------------------------------------------------------------------------------------------------
+# save_as_object_models function.
+#--------------------------------------------------------------------------------------------------
+
+def save_as_object_models(as_object_models, file_manifest=None, packaged_files=None):
+
+    """ saves the projects, a file manifest skips the ones whose content did not change, the projects are saved
+        as packages if the data of their packaged files is given """
+
+    if packaged_files is not None:
+        for as_object in as_object_models:
+            save_as_package(as_object[0], as_object[1], packaged_files)
+        return
+
+    for as_object in as_object_models:
+        if file_manifest is None:
+            ms_commands.info('Saving %s...' % as_object[0])
+            doc = WriteXml(as_object[0])
+            emit_project_xml(doc, as_object[1])
+            doc.close()
+        else:
+            # the project is emitted in memory so it is only written if it changed
+            doc = WriteXml(as_object[0], cStringIO.StringIO())
+            emit_project_xml(doc, as_object[1])
+            doc.flush()
+            if file_manifest.write_file(as_object[0], doc.file_object.getvalue()):
+                ms_commands.info('Saving %s...' % as_object[0])
+            else:
+                ms_commands.info('Skipping unchanged %s.' % as_object[0])
+            doc.close()
+
+
+#--------------------------------------------------------------------------------------------------
+# save_as_package function.
+#--------------------------------------------------------------------------------------------------
+
+def save_as_package(project_file_path, as_project, packaged_files):
+
+    """ saves a project and the geometry and texture files it refers to as an appleseed packaged project (.appleseedz),
+        packaged_files maps the paths of the files held in memory, e.g. geometry, to their data """
+
+    package_file_path = os.path.splitext(project_file_path)[0] + '.appleseedz'
+    project_directory = os.path.dirname(project_file_path)
+
+    ms_commands.info('Saving %s...' % package_file_path)
+
+    try:
+        package = zipfile.ZipFile(package_file_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+    except IOError:
+        ms_commands.error("IO error: failed to open {0} for writing.".format(package_file_path))
+
+    # the project is emitted in memory, the files it refers to are written from memory or read from the
+    # output directory, they keep their paths relative to the project which is stored at the root of the package
+    doc = WriteXml(project_file_path, cStringIO.StringIO())
+    emit_project_xml(doc, as_project)
+    doc.flush()
+    project_member_name = os.path.basename(project_file_path)
+    package.writestr(project_member_name, doc.file_object.getvalue())
+    doc.close()
+
+    member_names = set([project_member_name])
+    for file_name in list_as_project_files(as_project):
+        # files outside of the output directory, e.g. textures not converted to exr, are left where they are
+        if os.path.isabs(file_name):
+            continue
+        member_name = file_name.replace('\\', '/')
+        if member_name in member_names:
+            continue
+        member_names.add(member_name)
+
+        if member_name in packaged_files:
+            package.writestr(member_name, packaged_files[member_name])
+            continue
+
+        file_path = os.path.join(project_directory, file_name)
+        if not os.path.exists(file_path):
+            ms_commands.warning('Cannot add {0} to {1}, the file does not exist.'.format(file_path, package_file_path))
+            continue
+        package.write(file_path, member_name)
+
+    package.close()
+
+def list_as_project_files(as_project):
+
+    """ returns the names of the files the entities of a project refer to, in the order they are found """
+
+    file_names = [texture.file_name.value for texture in as_project.scene.textures]
+
+    assemblies = list(as_project.scene.assemblies)
+    while assemblies:
+        assembly = assemblies.pop(0)
+        assemblies.extend(assembly.assemblies)
+        for texture in assembly.textures:
+            file_names.append(texture.file_name.value)
+        for object in assembly.objects:
+            if object.file_names.__class__.__name__ == 'AsParameters':
+                file_names += [parameter.value for parameter in object.file_names.parameters]
+            else:
+                file_names.append(object.file_names.value)
+
+    return [file_name for file_name in file_names if file_name]
+
+
+#--------------------------------------------------------------------------------------------------
+# translate_scene_cache_in_processes function.
+#--------------------------------------------------------------------------------------------------
+
+def translate_scene_cache_in_processes(scene_cache_path, frame_list):
+
+    """ translates and saves the frames of a scene cache in parallel, one tools/translate_scene_cache.py process per core """
+
+    mayapy_path = ms_commands.find_path_to_mayapy()
+    if mayapy_path is None:
+        ms_commands.error("Cannot translate frames in parallel, mayapy not found.")
+
+    tool_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools', 'translate_scene_cache.py')
+    process_count = min(multiprocessing.cpu_count(), len(frame_list))
+
+    ms_commands.info("Translating {0} frames in {1} processes...".format(len(frame_list), process_count))
+
+    # frames are interleaved between the processes so each gets a share of the heavy parts of the animation,
+    # the output of a process is kept in a temporary file and added to the export log once it has finished
+    workers = []
+    for i in range(process_count):
+        frames = frame_list[i::process_count]
+        args = [mayapy_path, tool_path, scene_cache_path, '--frames', ','.join([str(frame) for frame in frames])]
+        log_file = tempfile.TemporaryFile()
+        if sys.platform == 'win32':
+            process = subprocess.Popen(args, stdout=log_file, stderr=subprocess.STDOUT, creationflags=0x08000000)
+        else:
+            process = subprocess.Popen(args, stdout=log_file, stderr=subprocess.STDOUT)
+        workers.append((frames, process, log_file))
+
+    failed_frames = []
+    for frames, process, log_file in workers:
+        process.wait()
+        log_file.seek(0)
+        for line in log_file:
+            log_worker_output(line.rstrip(), process.returncode != 0)
+        log_file.close()
+
+        if process.returncode != 0:
+            failed_frames += frames
+
+    if failed_frames:
+        ms_commands.error("Translation failed for frames {0}, see the script editor for details.".format(', '.join([str(frame) for frame in sorted(failed_frames)])))
+
+
+def log_worker_output(line, process_failed):
+    # the messages of a worker are already formatted by ms_commands.info() or ms_commands.warning(), other output
+    # such as the traceback of a failed worker is logged as a warning
+    if line.startswith('// '):
+        ms_commands.info(line[3:])
+    elif line.startswith('#  '):
+        ms_commands.warning(line[3:])
+    elif line:
+        if process_failed:
+            ms_commands.warning(line)
+        else:
+            ms_commands.info(line)
+
+
+#--------------------------------------------------------------------------------------------------
+# Scene cache files.
+#--------------------------------------------------------------------------------------------------
+
+# bumped whenever the settings or the M classes written to scene caches change, older caches are rejected
+# by read_scene_cache() instead of failing during translation on a missing setting
+SCENE_CACHE_VERSION = 4
+
+# params holding Maya specific objects, or only used while caching, are not written to scene caches
+scene_cache_ignored_params = ['entity_defs', 'obj_exporter', 'm_node_cache', 'unchanged_geometry_files', 'file_manifest']
+
+def get_scene_cache_path(params):
+    return os.path.join(params['output_directory'], params['scene_basename'] + '.mscache')
+
+def write_scene_cache(file_path, params, maya_scene, maya_environment):
+
+    """ writes a cached Maya scene to disk so it can be translated again without Maya, see tools/translate_scene_cache.py """
+
+    ms_commands.info('Writing scene cache %s...' % file_path)
+
+    settings = dict()
+    for key, value in params.items():
+        if key not in scene_cache_ignored_params:
+            settings[key] = value
+
+    try:
+        file_object = open(file_path, 'wb')
+    except IOError:
+        ms_commands.error("IO error: failed to open {0} for writing.".format(file_path))
+
+    # every M object references the params dict, the references are written as a persistent id and
+    # resolved to the settings read back from the file
+    pickler = cPickle.Pickler(file_object, cPickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = lambda obj: 'params' if obj is params else None
+    pickler.dump(('mayaseed_scene_cache', SCENE_CACHE_VERSION, ms_commands.MAYASEED_VERSION))
+    pickler.dump(settings)
+    pickler.dump((maya_scene, maya_environment))
+    file_object.close()
+
+def read_scene_cache(file_path):
+
+    """ reads a scene cache written by write_scene_cache() and returns the params, the Maya scene and the environment """
+
+    try:
+        file_object = open(file_path, 'rb')
+    except IOError:
+        ms_commands.error("IO error: failed to open {0} for reading.".format(file_path))
+
+    unpickler = cPickle.Unpickler(file_object)
+    header = unpickler.load()
+    if header[:2] != ('mayaseed_scene_cache', SCENE_CACHE_VERSION):
+        file_object.close()
+        ms_commands.error("{0} is not a scene cache of version {1}, export the scene from Maya again.".format(file_path, SCENE_CACHE_VERSION))
+
+    params = unpickler.load()
+    unpickler.persistent_load = lambda persistent_id: params
+    maya_scene, maya_environment = unpickler.load()
+    file_object.close()
+
+    return params, maya_scene, maya_environment
+
+
+#--------------------------------------------------------------------------------------------------
+# emit_project_xml function.
+#--------------------------------------------------------------------------------------------------
+
+def emit_project_xml(doc, as_project):
+    doc.append_line('<?xml version="1.0" encoding="UTF-8"?>')
+    doc.append_line('<!-- File generated by Mayaseed version {0} -->'.format(ms_commands.MAYASEED_VERSION))
+    as_project.emit_xml(doc)
+
+
 #--------------------------------------------------------------------------------------------------
 # export function.
 #--------------------------------------------------------------------------------------------------
@@ -21,9 +21,14 @@
 # THE SOFTWARE.
 #
 
-import maya.cmds as cmds
-import maya.OpenMaya as OpenMaya
+try:
+    import maya.cmds as cmds
+    import maya.OpenMaya as OpenMaya
+except ImportError:
+    # Maya is not available when a scene cache is translated by tools/translate_scene_cache.py
+    cmds = OpenMaya = None
 import ms_commands
+import ms_format
 import os
 
 SCRIPT_VERSION = '0.1.3'
@@ -45,6 +50,14 @@ def export(object_name, file_path, overwrite=True):
         cmds.error(error_msg)
         raise RuntimeError(error_msg)
 
+    write(object_name, file_object)
+
+    file_object.close()
+
+def write(object_name, file_object):
+
+    """ writes the OBJ data of a mesh to a file like object, e.g. a buffer """
+
     file_object.write("# File generated by ms_export_obj (Python) version {0}\n".format(SCRIPT_VERSION))
 
     sel = OpenMaya.MSelectionList()
@@ -58,21 +71,29 @@ def export(object_name, file_path, overwrite=True):
     # Write vertices.
     points = OpenMaya.MPointArray() 
     mesh.getPoints(points)
+    point_values = []
     for i in range(points.length()):
-        file_object.write("v {0} {1} {2}\n".format(points[i].x, points[i].y, points[i].z))
+        point = points[i]
+        point_values += [point.x, point.y, point.z]
+    file_object.writelines(ms_format.format_rows(point_values, 3, prefix='v '))
     
     # Write UV coordinates.
     us = OpenMaya.MFloatArray()
     vs = OpenMaya.MFloatArray()
     mesh.getUVs(us, vs)
+    uv_values = []
     for i in range(us.length()):
-        file_object.write("vt {0} {1}\n".format(us[i], vs[i]))
+        uv_values += [us[i], vs[i]]
+    file_object.writelines(ms_format.format_rows(uv_values, 2, prefix='vt '))
 
     # Write normals.
     normals = OpenMaya.MFloatVectorArray()
     mesh.getNormals(normals, 2) # 2 = object space
+    normal_values = []
     for i in range(normals.length()):
-        file_object.write("vn {0} {1} {2}\n".format(normals[i].x, normals[i].y, normals[i].z))
+        normal = normals[i]
+        normal_values += [normal.x, normal.y, normal.z]
+    file_object.writelines(ms_format.format_rows(normal_values, 3, prefix='vn '))
 
     # Write faces.
     poly_it = OpenMaya.MItMeshPolygon(mesh.object())
@@ -100,5 +121,3 @@ def export(object_name, file_path, overwrite=True):
 
         file_object.write("\n")
         poly_it.next()
-
-    file_object.close()
@@ -0,0 +1,306 @@
+#
+# Copyright (c) 2012-2013 Jonathan Topf
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+# Note: ms_export is reloaded before every export from the menu, this module is not so
+# that the sessions and their Maya callbacks survive from one export to the next.
+
+try:
+    import maya.OpenMaya as OpenMaya
+except ImportError:
+    # Maya is not available when a scene cache is translated by tools/translate_scene_cache.py
+    OpenMaya = None
+import hashlib
+import os
+import shutil
+import tempfile
+import ms_commands
+
+
+#--------------------------------------------------------------------------------------------------
+# Export sessions, keyed by render settings node.
+#--------------------------------------------------------------------------------------------------
+
+sessions = dict()
+
+def get_session(render_settings_node):
+    if render_settings_node not in sessions:
+        sessions[render_settings_node] = ExportSession(render_settings_node)
+    return sessions[render_settings_node]
+
+def end_session(render_settings_node):
+    if render_settings_node in sessions:
+        sessions.pop(render_settings_node).remove_callbacks()
+
+
+#--------------------------------------------------------------------------------------------------
+# ExportSession class.
+#--------------------------------------------------------------------------------------------------
+
+class ExportSession():
+
+    """ Keeps the data of the previous export of a render settings node and tracks the Maya nodes edited since, the shading
+        nodes, textures and geometry files of the nodes that were not edited are reused by the next export """
+
+    # these params hold objects rather than settings and are not compared between exports
+    ignored_params = ['entity_defs', 'obj_exporter', 'm_node_cache', 'unchanged_geometry_files', 'file_manifest', 'packaged_files']
+
+    def __init__(self, render_settings_node):
+        self.render_settings_node = render_settings_node
+        self.settings = None
+        self.needs_full_export = True
+        self.exporting = False
+        self.dirty_nodes = set()
+
+        # data kept from the previous export
+        self.m_node_cache = dict()
+        self.geometry_files = dict()
+        self.file_manifest = FileManifest()
+
+        self.scene_callback_ids = []
+        # node name -> ids of the callbacks registered on the node
+        self.node_callback_ids = dict()
+
+    def begin_export(self, params):
+
+        """ seeds params with the cached data that is still valid, must be called before the scene is cached """
+
+        settings = dict()
+        for key, value in params.items():
+            if key not in ExportSession.ignored_params:
+                settings[key] = value
+
+        reuses_data = not self.needs_full_export and settings == self.settings
+        self.settings = settings
+
+        # cleared by end_export() so an export that fails half way is followed by a full export
+        self.needs_full_export = True
+        self.exporting = True
+
+        params['m_node_cache'] = dict()
+        params['unchanged_geometry_files'] = set()
+
+        # the files written by the previous export are not written again if their content did not change
+        params['file_manifest'] = self.file_manifest
+
+        if not reuses_data:
+            ms_commands.info("Scene structure or settings changed since the previous export, nothing is reused.")
+            return
+
+        for key, (m_node, dependencies, image_times) in self.m_node_cache.items():
+            if not dependencies.isdisjoint(self.dirty_nodes):
+                continue
+            if any([ms_commands.get_modification_time(image_name) != image_time for image_name, image_time in image_times.items()]):
+                continue
+            params['m_node_cache'][key] = m_node
+
+        for mesh_name, file_paths in self.geometry_files.items():
+            if mesh_name not in self.dirty_nodes:
+                params['unchanged_geometry_files'].update(file_paths)
+
+        ms_commands.info("{0} nodes edited since the previous export, reusing {1} of {2} cached shading nodes.".format(len(self.dirty_nodes), len(params['m_node_cache']), len(self.m_node_cache)))
+
+    def end_export(self, m_node_cache, geometry_files):
+
+        """ keeps the reusable data of a completed export and starts tracking the nodes it was built from """
+
+        # m_node_cache maps cache keys to (M node, names of the Maya nodes it depends on, image modification times) tuples,
+        # geometry_files maps the names of non deforming meshes to the files they were written to
+        self.m_node_cache = m_node_cache
+        self.geometry_files = geometry_files
+
+        node_names = set(geometry_files.keys())
+        for m_node, dependencies, image_times in m_node_cache.values():
+            node_names.update(dependencies)
+
+        self.remove_node_callbacks()
+        for node_name in node_names:
+            node = ms_commands.get_dependency_node(node_name)
+            self.node_callback_ids[node_name] = [OpenMaya.MNodeMessage.addNodeDirtyCallback(node, self.node_dirty, node_name),
+                                                 OpenMaya.MNodeMessage.addAttributeChangedCallback(node, self.attribute_changed, node_name),
+                                                 OpenMaya.MNodeMessage.addNodePreRemovalCallback(node, self.node_removed, node_name)]
+
+        if not self.scene_callback_ids:
+            self.add_scene_callbacks()
+
+        self.dirty_nodes = set()
+        self.needs_full_export = False
+        self.exporting = False
+
+    def add_scene_callbacks(self):
+        # any change to the set of nodes, their names or the DAG hierarchy requires a full export
+        self.scene_callback_ids.append(OpenMaya.MDGMessage.addNodeAddedCallback(self.structure_changed, 'dependNode'))
+        self.scene_callback_ids.append(OpenMaya.MDGMessage.addNodeRemovedCallback(self.structure_changed, 'dependNode'))
+        self.scene_callback_ids.append(OpenMaya.MDagMessage.addParentAddedCallback(self.parent_changed))
+        self.scene_callback_ids.append(OpenMaya.MDagMessage.addParentRemovedCallback(self.parent_changed))
+        self.scene_callback_ids.append(OpenMaya.MNodeMessage.addNameChangedCallback(OpenMaya.MObject(), self.name_changed))
+        self.scene_callback_ids.append(OpenMaya.MSceneMessage.addCallback(OpenMaya.MSceneMessage.kBeforeNew, self.scene_changed))
+        self.scene_callback_ids.append(OpenMaya.MSceneMessage.addCallback(OpenMaya.MSceneMessage.kBeforeOpen, self.scene_changed))
+
+    def remove_node_callbacks(self):
+        for callback_ids in self.node_callback_ids.values():
+            for callback_id in callback_ids:
+                OpenMaya.MMessage.removeCallback(callback_id)
+        self.node_callback_ids = dict()
+
+    def remove_callbacks(self):
+        self.remove_node_callbacks()
+        for callback_id in self.scene_callback_ids:
+            OpenMaya.MMessage.removeCallback(callback_id)
+        self.scene_callback_ids = []
+
+    # changes made by the export itself, e.g. moving the current time, are ignored
+
+    def node_dirty(self, node, node_name):
+        if not self.exporting:
+            self.dirty_nodes.add(node_name)
+
+    def attribute_changed(self, message, plug, other_plug, node_name):
+        if not self.exporting:
+            self.dirty_nodes.add(node_name)
+
+    def node_removed(self, node, node_name):
+        # the callbacks of a deleted node are not removed by Maya, the node may come back through undo but that
+        # is a structural change which requires a full export and new callbacks anyway
+        for callback_id in self.node_callback_ids.pop(node_name, []):
+            OpenMaya.MMessage.removeCallback(callback_id)
+        if not self.exporting:
+            self.needs_full_export = True
+
+    def structure_changed(self, node, client_data):
+        if not self.exporting:
+            self.needs_full_export = True
+
+    def parent_changed(self, child, parent, client_data):
+        if not self.exporting:
+            self.needs_full_export = True
+
+    def name_changed(self, node, previous_name, client_data):
+        if not self.exporting:
+            self.needs_full_export = True
+
+    def scene_changed(self, client_data):
+        self.needs_full_export = True
+
+
+#--------------------------------------------------------------------------------------------------
+# FileManifest class.
+#--------------------------------------------------------------------------------------------------
+
+class FileManifest():
+
+    """ Keeps the content hashes of the files written to an output directory in a sidecar file so that
+        re-exports leave unchanged files, and their modification times, untouched, a manifest without
+        a directory is only kept in memory by an export session """
+
+    file_name = 'mayaseed_manifest.txt'
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.is_modified = False
+
+        # file path, relative to the directory if there is one -> (content hash, modification time)
+        self.entries = dict()
+        if directory is not None and os.path.exists(self.get_file_path()):
+            for line in open(self.get_file_path(), 'r'):
+                fields = line.rstrip('\n').split(' ', 2)
+                if len(fields) == 3:
+                    self.entries[fields[2]] = (fields[0], float(fields[1]))
+
+    def get_file_path(self):
+        return os.path.join(self.directory, self.file_name)
+
+    def get_key(self, file_path):
+        if self.directory is None:
+            return file_path
+        return os.path.relpath(file_path, self.directory).replace('\\', '/')
+
+    def is_unchanged(self, file_path, content_hash):
+        # a file modified since it was recorded, e.g. by a parallel export or by hand, is written again
+        entry = self.entries.get(self.get_key(file_path))
+        return entry is not None and entry[0] == content_hash and os.path.exists(file_path) and os.path.getmtime(file_path) == entry[1]
+
+    def record(self, file_path, content_hash):
+        self.entries[self.get_key(file_path)] = (content_hash, os.path.getmtime(file_path))
+        self.is_modified = True
+
+    def write_file(self, file_path, content):
+
+        """ writes content to file_path unless the file already holds it, returns True if the file was written """
+
+        content_hash = hashlib.md5(content).hexdigest()
+        if self.is_unchanged(file_path, content_hash):
+            return False
+
+        try:
+            file_object = open(file_path, 'w')
+        except IOError:
+            ms_commands.error("IO error: failed to open {0} for writing.".format(file_path))
+        file_object.write(content)
+        file_object.close()
+
+        self.record(file_path, content_hash)
+        return True
+
+    def export_file(self, file_path, export_function):
+
+        """ calls export_function on a temporary file and only moves the result to file_path if its content changed,
+            returns True if the file was written """
+
+        file_descriptor, temp_file_path = tempfile.mkstemp(suffix=os.path.splitext(file_path)[1])
+        os.close(file_descriptor)
+
+        try:
+            export_function(temp_file_path)
+            md5 = hashlib.md5()
+            temp_file = open(temp_file_path, 'rb')
+            for chunk in iter(lambda: temp_file.read(1 << 20), ''):
+                md5.update(chunk)
+            temp_file.close()
+            content_hash = md5.hexdigest()
+
+            if self.is_unchanged(file_path, content_hash):
+                return False
+
+            # copied rather than moved so the file gets the usual permissions instead of those of a temporary file
+            shutil.copyfile(temp_file_path, file_path)
+        finally:
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+
+        self.record(file_path, content_hash)
+        return True
+
+    def save(self):
+        if self.directory is None or not self.is_modified:
+            return
+
+        file_path = self.get_file_path()
+        try:
+            file_object = open(file_path, 'w')
+        except IOError:
+            ms_commands.error("IO error: failed to open {0} for writing.".format(file_path))
+        for key in sorted(self.entries):
+            content_hash, modification_time = self.entries[key]
+            file_object.write('{0} {1!r} {2}\n'.format(content_hash, modification_time, key))
+        file_object.close()
+
+        self.is_modified = False
@@ -0,0 +1,68 @@
+#
+# Copyright (c) 2012-2013 Jonathan Topf
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+# Float formatting shared by the project and geometry writers. Whole sequences of floats are converted
+# to text with a single % operation using format strings that are built once and cached.
+#
+# A precision of None formats values like str() does, otherwise values are written with that many decimals.
+
+formats = dict()
+
+# rows formatted by a single % operation in format_rows()
+rows_per_chunk = 1024
+
+
+#--------------------------------------------------------------------------------------------------
+# Format strings.
+#--------------------------------------------------------------------------------------------------
+
+def get_format(value_count, precision=None, prefix='', suffix='', row_count=1):
+
+    """ returns a format string for row_count rows of value_count space separated values, each row starting with prefix and ending with suffix """
+
+    key = (value_count, precision, prefix, suffix, row_count)
+    format_string = formats.get(key)
+    if format_string is None:
+        value_format = '%s' if precision is None else '%.{0}f'.format(precision)
+        format_string = (prefix + ' '.join([value_format] * value_count) + suffix) * row_count
+        formats[key] = format_string
+    return format_string
+
+
+#--------------------------------------------------------------------------------------------------
+# Formatting functions.
+#--------------------------------------------------------------------------------------------------
+
+def format_floats(values, precision=None):
+    return get_format(len(values), precision) % tuple(values)
+
+def format_rows(values, row_length, precision=None, prefix='', suffix='\n'):
+
+    """ formats a flat sequence of floats as rows of row_length values and returns the text as a list of chunks """
+
+    chunks = []
+    chunk_length = row_length * rows_per_chunk
+    for start in range(0, len(values), chunk_length):
+        chunk = values[start:start + chunk_length]
+        chunk_format = get_format(row_length, precision, prefix, suffix, len(chunk) // row_length)
+        chunks.append(chunk_format % tuple(chunk))
+    return chunks
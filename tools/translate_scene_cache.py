@@ -0,0 +1,105 @@
+#!/usr/bin/python
+
+#
+# Copyright (c) 2013 Jonathan Topf
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+#
+# Translates a scene cache written by Mayaseed (enable "Write Scene Cache" in the render settings)
+# into appleseed project files without Maya. Render settings can be overridden on the command line:
+#
+#   translate_scene_cache.py my_scene.mscache --set output_res_width=1920 --set output_res_height=1080
+#
+# Mayaseed also runs it on subsets of the frames (--frames 1,5,9) to translate animations in parallel.
+#
+
+import sys
+import os
+import ast
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import ms_commands
+import ms_export
+import ms_export_session
+
+
+def parse_setting(setting):
+    name, separator, value = setting.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError('settings must be given as name=value, got "{0}"'.format(setting))
+
+    # values that are not Python literals are kept as strings
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass
+
+    return name, value
+
+
+def parse_frames(frames):
+    try:
+        return [int(frame) for frame in frames.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('frames must be given as a comma separated list of frame numbers, got "{0}"'.format(frames))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Translate a Mayaseed scene cache into appleseed projects without Maya.')
+    parser.add_argument('scene_cache', help='scene cache file written during export')
+    parser.add_argument('-s', '--set', action='append', default=[], type=parse_setting, metavar='NAME=VALUE', help='override an export setting, can be repeated')
+    parser.add_argument('-f', '--frames', type=parse_frames, metavar='FRAMES', help='comma separated list of the frames to translate, all exported frames by default')
+    args = parser.parse_args()
+
+    start_time = time.time()
+
+    params, maya_scene, maya_environment = ms_export.read_scene_cache(args.scene_cache)
+
+    for name, value in args.set:
+        if name not in params:
+            ms_commands.warning('Unknown setting "{0}", adding it anyway.'.format(name))
+        params[name] = value
+
+    # parallel translations share the output directory, only a translation of every frame keeps the file manifest up to date
+    file_manifest = None
+    if params['skip_unchanged_files'] and args.frames is None:
+        file_manifest = ms_export_session.FileManifest(params['output_directory'])
+
+    # the geometry of packaged projects is held by the scene cache, the geometry of a scene cache written
+    # without packaging is read from the output directory
+    packaged_files = None
+    if params['package_projects']:
+        packaged_files = params.get('packaged_files', dict())
+
+    as_object_models = ms_export.translate_maya_scene(params, maya_scene, maya_environment, args.frames)
+    ms_export.save_as_object_models(as_object_models, file_manifest=file_manifest, packaged_files=packaged_files)
+
+    if file_manifest is not None:
+        file_manifest.save()
+
+    ms_commands.info('Translated {0} in {1:.2f} seconds.'.format(args.scene_cache, time.time() - start_time))
+
+
+if __name__ == '__main__':
+    main()